@@ -0,0 +1,148 @@
+import threading
+from constants import ROWS, COLS, CHUNK_SIZE, AUTOSAVE_INTERVAL, AUTOSAVE_PATH
+from station import STATION_FORMAT_VERSION, write_json_atomic
+
+
+class Snapshot:
+    """Station state frozen at a tick boundary, safe to read from another thread.
+
+    Holds only immutable values: per-chunk tuples of structure shared with
+    the autosaver's cache, plus the room and gas values copied this tick.
+    """
+    def __init__(self, chunks, room_count, volatile):
+        self.chunks = chunks
+        self.room_count = room_count
+        self.volatile = volatile
+
+    def to_dict(self):
+        """Encode in the station file format, so load_station can read autosaves"""
+        tiles = {}
+        for chunk in self.chunks.values():
+            for row, col, wall, door, wire, pipe, component, damage in chunk:
+                entry = {"row": row, "col": col}
+                for flag, value in (("wall", wall), ("door", door), ("wire", wire), ("pipe", pipe)):
+                    if value:
+                        entry[flag] = True
+                if component:
+                    entry["component"] = component
+                if damage:
+                    entry["damage"] = damage
+                tiles[(row, col)] = entry
+        for row, col, room_id, gases in self.volatile:
+            entry = tiles.setdefault((row, col), {"row": row, "col": col})
+            if room_id is not None:
+                entry["room"] = room_id
+            if gases:
+                entry["gases"] = list(gases)
+
+        return {
+            "version": STATION_FORMAT_VERSION,
+            "rows": ROWS,
+            "cols": COLS,
+            "rooms": self.room_count,
+            "tiles": list(tiles.values()),
+        }
+
+
+class Autosaver:
+    """Periodically saves the station without blocking the main loop.
+
+    Structure (walls, wiring, components) is cached per map chunk and only
+    re-captured for chunks in simulator.changed_chunks, so a snapshot costs
+    the size of the edits since the last one plus one copy of the room and
+    gas values, which change every tick. Encoding and the atomic write run on
+    a background thread. If a save is still running when the next one is
+    due, the newer snapshot replaces the waiting one rather than queueing.
+    """
+    def __init__(self, simulator, path=AUTOSAVE_PATH, interval=AUTOSAVE_INTERVAL):
+        self.simulator = simulator
+        self.path = path
+        self.interval = interval
+        self.chunks = {}  # Structure of every chunk as of the last snapshot
+        self.last_save_tick = simulator.update_counter
+        self.saves = 0
+        self.error = None
+
+        self.pending = None
+        self.condition = threading.Condition()
+        self.stopping = False
+        self.thread = threading.Thread(target=self.writer, name="autosave", daemon=True)
+        self.thread.start()
+
+    def update(self):
+        """Call once per frame after the tick; takes a snapshot when one is due"""
+        if self.simulator.update_counter - self.last_save_tick >= self.interval:
+            self.save()
+
+    def save(self):
+        snapshot = self.snapshot()
+        self.last_save_tick = self.simulator.update_counter
+        with self.condition:
+            self.pending = snapshot
+            self.condition.notify()
+
+    def snapshot(self):
+        simulator = self.simulator
+        if not self.chunks:
+            changed = {(row, col) for row in range((ROWS - 1) // CHUNK_SIZE + 1)
+                       for col in range((COLS - 1) // CHUNK_SIZE + 1)}
+        else:
+            changed = simulator.changed_chunks
+        for key in changed:
+            self.chunks[key] = self.capture_chunk(key)
+        simulator.changed_chunks = set()
+
+        room_ids = {room: index for index, room in enumerate(simulator.rooms)}
+        # Gases are copied with a full pass rather than per chunk from
+        # changes.gases_updated: following gas changes means subscribing to
+        # the change tracker, which then rounds every tile the solver touches
+        # on every tick, costing far more across AUTOSAVE_INTERVAL ticks than
+        # this one walk. The tracker also drops changes below its precision,
+        # which a save must not.
+        volatile = []
+        for grid_row in simulator.grid:
+            for tile in grid_row:
+                gases = tile.gases
+                has_gas = gases.o2 or gases.co2 or gases.n2
+                if tile.room in room_ids or has_gas:
+                    volatile.append((tile.row, tile.col, room_ids.get(tile.room),
+                                     (gases.o2, gases.co2, gases.n2) if has_gas else None))
+        # The dict copy is the second buffer: later edits replace chunk tuples
+        # in self.chunks without touching the ones the writer is reading
+        return Snapshot(dict(self.chunks), len(simulator.rooms), volatile)
+
+    def capture_chunk(self, key):
+        grid = self.simulator.grid
+        row0, col0 = key[0] * CHUNK_SIZE, key[1] * CHUNK_SIZE
+        cells = []
+        for row in range(row0, min(row0 + CHUNK_SIZE, ROWS)):
+            for col in range(col0, min(col0 + CHUNK_SIZE, COLS)):
+                tile = grid[row][col]
+                if tile.wall or tile.door or tile.wire or tile.pipe or tile.component or tile.damage:
+                    component = type(tile.component).__name__ if tile.component else None
+                    cells.append((row, col, tile.wall, tile.door, tile.wire, tile.pipe, component, tile.damage))
+        return tuple(cells)
+
+    def writer(self):
+        while True:
+            with self.condition:
+                while self.pending is None and not self.stopping:
+                    self.condition.wait()
+                if self.pending is None:
+                    return
+                snapshot, self.pending = self.pending, None
+            try:
+                write_json_atomic(snapshot.to_dict(), self.path)
+                self.saves += 1
+                self.error = None
+            except Exception as e:
+                # Keep the writer alive: a failed save must not stop later ones
+                self.error = e
+                print(f"Autosave failed: {e}")
+
+    def close(self):
+        """Write any waiting snapshot and stop the writer thread"""
+        with self.condition:
+            self.stopping = True
+            self.condition.notify()
+        self.thread.join()
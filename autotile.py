@@ -0,0 +1,106 @@
+import pygame
+from constants import ROWS, COLS, ORANGE, RED, YELLOW_BRIGHT, PIPE_COLOR
+
+# Bit set in a tile's connection mask for a link to each neighbour
+LINK_BITS = (((0, 1), 1), ((1, 0), 2), ((0, -1), 4), ((-1, 0), 8))
+
+# Pre-rendered wire and pipe sprites by (size, wire_mask, powered, pipe_mask, pipe_color)
+link_sprites = {}
+LINK_SPRITE_LIMIT = 4096  # Zooming through many tile sizes starts the atlas over past this
+
+
+def link_mask(flags, row, col):
+    """Connection mask of the tile at (row, col), given whether each tile has the wire or pipe"""
+    mask = 0
+    for (dr, dc), bit in LINK_BITS:
+        new_row, new_col = row + dr, col + dc
+        if 0 <= new_row < ROWS and 0 <= new_col < COLS and flags(new_row, new_col):
+            mask |= bit
+    return mask
+
+
+class LinkMasks:
+    """Every tile's 4-bit wire and pipe connection masks, kept up to date as tiles are edited.
+
+    touch() is called for every edited tile (through Simulator.mark_changed,
+    often before the edit itself), and refresh() recomputes the touched
+    tiles and their neighbours before the next frame is drawn, so drawing
+    never has to look at a tile's neighbours.
+    """
+    def __init__(self, grid):
+        self.grid = grid
+        self.wire = bytearray(ROWS * COLS)
+        self.pipe = bytearray(ROWS * COLS)
+        self.dirty = {(row, col) for row in range(ROWS) for col in range(COLS)}
+
+    def touch(self, row, col):
+        self.dirty.add((row, col))
+
+    def refresh(self):
+        if not self.dirty:
+            return
+        grid = self.grid
+        has_wire = lambda row, col: grid[row][col].wire
+        has_pipe = lambda row, col: grid[row][col].pipe
+        tiles = set()
+        for row, col in self.dirty:
+            tiles.add((row, col))
+            for (dr, dc), _ in LINK_BITS:
+                if 0 <= row + dr < ROWS and 0 <= col + dc < COLS:
+                    tiles.add((row + dr, col + dc))
+        self.dirty = set()
+        for row, col in tiles:
+            tile = grid[row][col]
+            i = row * COLS + col
+            self.wire[i] = link_mask(has_wire, row, col) if tile.wire else 0
+            self.pipe[i] = link_mask(has_pipe, row, col) if tile.pipe else 0
+
+    def masks(self, row, col):
+        i = row * COLS + col
+        return self.wire[i], self.pipe[i]
+
+
+def link_sprite(size, wire_mask, powered, pipe_mask, pipe_color):
+    """The wires and pipes of a tile size pixels wide, rendered once and then reused.
+
+    powered is None for a tile without a wire and pipe_color None for one
+    without a pipe, like in render states.
+    """
+    key = (size, wire_mask, powered, pipe_mask, pipe_color)
+    sprite = link_sprites.get(key)
+    if sprite is not None:
+        return sprite
+
+    if len(link_sprites) >= LINK_SPRITE_LIMIT:
+        link_sprites.clear()
+    sprite = pygame.Surface((size, size), pygame.SRCALPHA)
+    center = size // 2
+
+    if powered is not None:
+        # Wire connections run from the centre to the edge; the neighbour draws the other half
+        color = ORANGE if powered else RED
+        for (dr, dc), bit in LINK_BITS:
+            if wire_mask & bit:
+                pygame.draw.line(sprite, color, (center, center), (center + dc * size, center + dr * size), 2)
+        pygame.draw.circle(sprite, color, (center, center), 4)
+        if powered:
+            bolt_points = [
+                (center - 3, center - 5),
+                (center + 2, center - 1),
+                (center - 1, center + 1),
+                (center + 3, center + 5)
+            ]
+            pygame.draw.lines(sprite, YELLOW_BRIGHT, False, bolt_points, 2)
+
+    if pipe_color is not None:
+        # Pipe connections with a coloured centre and a brown outline
+        for (dr, dc), bit in LINK_BITS:
+            if pipe_mask & bit:
+                end = (center + dc * size, center + dr * size)
+                pygame.draw.line(sprite, PIPE_COLOR, (center, center), end, 4)
+                pygame.draw.line(sprite, pipe_color, (center, center), end, 2)
+        pygame.draw.circle(sprite, PIPE_COLOR, (center, center), 4)
+        pygame.draw.circle(sprite, pipe_color, (center, center), 3)
+
+    link_sprites[key] = sprite
+    return sprite
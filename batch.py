@@ -0,0 +1,204 @@
+"""Headless batch runner for station files.
+
+Runs every combination of station, tick count and constant override in a
+process pool and appends one JSON summary per run to the output file:
+
+    python batch.py stations/*.json --ticks 3000 6000 \\
+        --set GAS_SPREAD_RATE=0.05,0.1 --set PLANT_O2_RATE=0.2 -o results.jsonl
+
+Runs whose inputs hash to a key already present in the output are skipped,
+so an interrupted overnight batch can simply be restarted.
+"""
+import argparse
+import ast
+import hashlib
+import itertools
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import constants
+
+# Bump when the simulation or summary changes so stale results are not reused
+RUNNER_VERSION = 1
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# Project modules found by the last scan of sys.modules, and how many modules were loaded then
+scanned_modules = []
+scanned_count = 0
+
+
+def project_modules():
+    """Loaded modules from this directory, which copy constants with `from constants import ...`
+
+    sys.modules is only scanned again once more modules have been loaded, so
+    overrides can be switched often (fleet.py does it around every tick).
+    """
+    global scanned_modules, scanned_count
+    if len(sys.modules) != scanned_count:
+        scanned_modules = []
+        for module in list(sys.modules.values()):
+            path = getattr(module, "__file__", None)
+            if path and os.path.dirname(os.path.abspath(path)) == PACKAGE_DIR:
+                scanned_modules.append(module)
+        scanned_count = len(sys.modules)
+    return scanned_modules
+
+
+def apply_overrides(overrides):
+    """Set constants everywhere they were imported, returning the previous values"""
+    previous = {}
+    for name, value in overrides.items():
+        if not name.isupper() or not hasattr(constants, name):
+            raise ValueError(f"Unknown constant: {name}")
+        previous[name] = getattr(constants, name)
+        for module in project_modules():
+            if hasattr(module, name):
+                setattr(module, name, value)
+    return previous
+
+
+def run_key(station_bytes, ticks, overrides):
+    """Hash everything that determines the outcome of a run"""
+    digest = hashlib.sha256(station_bytes)
+    digest.update(json.dumps(
+        {"ticks": ticks, "overrides": overrides, "runner": RUNNER_VERSION},
+        sort_keys=True
+    ).encode())
+    return digest.hexdigest()
+
+
+def simulate(station_path, ticks, overrides):
+    """Run one station headless for the given number of ticks and summarise it"""
+    from simulator import Simulator
+    from components import Engine
+    from station import load_station
+
+    previous = apply_overrides(overrides)
+    try:
+        simulator = Simulator(headless=True)
+        load_station(simulator, station_path)
+
+        engine_samples = 0
+        engine_powered = 0
+        min_pressure = None
+        max_pressure = None
+        for _ in range(ticks):
+            simulator.tick()
+            if simulator.update_counter % 10 == 0:
+                for row, col in simulator.components.positions(Engine):
+                    engine_samples += 1
+                    engine_powered += simulator.grid[row][col].component.powered
+            if simulator.update_counter % 5 == 0:
+                for room in simulator.rooms:
+                    pressure = room.pressure()
+                    min_pressure = pressure if min_pressure is None else min(min_pressure, pressure)
+                    max_pressure = pressure if max_pressure is None else max(max_pressure, pressure)
+
+        return {
+            "rooms": [
+                {"tiles": len(room.tiles), "breathability": room.get_breathability(),
+                 "pressure": room.pressure()}
+                for room in simulator.rooms
+            ],
+            "engine_uptime": engine_powered / engine_samples if engine_samples else None,
+            "min_pressure": min_pressure,
+            "max_pressure": max_pressure,
+        }
+    finally:
+        apply_overrides(previous)
+
+
+def parse_override(text):
+    """Parse NAME=v1,v2,... into (NAME, [values])"""
+    name, sep, values = text.partition("=")
+    if not sep or not values:
+        raise argparse.ArgumentTypeError(f"Expected NAME=VALUE[,VALUE...], got {text!r}")
+    parsed = []
+    for value in values.split(","):
+        try:
+            parsed.append(ast.literal_eval(value))
+        except (ValueError, SyntaxError):
+            parsed.append(value)
+    return name.strip(), parsed
+
+
+def load_done_keys(path):
+    done = set()
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        done.add(json.loads(line)["key"])
+                    except (ValueError, KeyError):
+                        continue  # Ignore a half-written line from an interrupted run
+    return done
+
+
+def build_runs(stations, ticks_list, override_axes):
+    names = [name for name, _ in override_axes]
+    combos = list(itertools.product(*[values for _, values in override_axes]))
+    for station_path in stations:
+        with open(station_path, "rb") as f:
+            station_bytes = f.read()
+        for ticks in ticks_list:
+            for combo in combos:
+                overrides = dict(zip(names, combo))
+                yield run_key(station_bytes, ticks, overrides), station_path, ticks, overrides
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run station files headless in parallel.")
+    parser.add_argument("stations", nargs="+", help="station JSON files (save with Ctrl+S in game)")
+    parser.add_argument("--ticks", type=int, nargs="+", default=[3600],
+                        help="tick counts to simulate each station for (default: 3600)")
+    parser.add_argument("--set", dest="overrides", type=parse_override, action="append", default=[],
+                        metavar="NAME=V1,V2", help="override a constant; several values sweep it")
+    parser.add_argument("-o", "--output", default="results.jsonl", help="JSON lines output file")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    for name, _ in args.overrides:
+        if not name.isupper() or not hasattr(constants, name):
+            parser.error(f"unknown constant: {name}")
+
+    done = load_done_keys(args.output)
+    requested = list(build_runs(args.stations, args.ticks, args.overrides))
+    runs = [run for run in requested if run[0] not in done]
+    skipped = len(requested) - len(runs)
+    print(f"{len(runs)} runs to do ({skipped} of {len(requested)} already done in {args.output})")
+    if not runs:
+        return 0
+
+    failures = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool, open(args.output, "a") as out:
+        futures = {
+            pool.submit(simulate, station_path, ticks, overrides): (key, station_path, ticks, overrides)
+            for key, station_path, ticks, overrides in runs
+        }
+        for completed, future in enumerate(as_completed(futures), 1):
+            key, station_path, ticks, overrides = futures[future]
+            try:
+                summary = future.result()
+            except Exception as e:
+                failures += 1
+                print(f"[{completed}/{len(runs)}] {station_path} failed: {e}", file=sys.stderr)
+                continue
+            record = {"key": key, "station": station_path, "ticks": ticks, "overrides": overrides}
+            record.update(summary)
+            out.write(json.dumps(record) + "\n")
+            out.flush()  # Keep finished runs even if the batch is interrupted
+            print(f"[{completed}/{len(runs)}] {station_path} ticks={ticks} {overrides}")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
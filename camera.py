@@ -0,0 +1,68 @@
+import pygame
+from constants import ROWS, COLS, TILE_SIZE, GRID_SIZE, HEIGHT, CAMERA_MAX_TILE_PIXELS
+
+
+class Camera:
+    """Zoom and pan over the map, mapping world pixels to the game view.
+
+    World pixels are tile coordinates times TILE_SIZE, the space tiles and
+    particles are positioned in. (x, y) is the world point shown at the
+    top-left of the game view and zoom is screen pixels per world pixel, so
+    zoom 1 shows the whole map as before.
+    """
+    def __init__(self, view_width=GRID_SIZE, view_height=HEIGHT):
+        self.view_width = view_width
+        self.view_height = view_height
+        self.x = 0.0
+        self.y = 0.0
+        self.zoom = 1.0
+        self.min_zoom = 1.0
+        self.max_zoom = max(CAMERA_MAX_TILE_PIXELS / TILE_SIZE, 1.0)
+
+    def clamp(self):
+        """Keep the view over the map"""
+        self.zoom = min(max(self.zoom, self.min_zoom), self.max_zoom)
+        self.x = min(max(self.x, 0.0), max(COLS * TILE_SIZE - self.view_width / self.zoom, 0.0))
+        self.y = min(max(self.y, 0.0), max(ROWS * TILE_SIZE - self.view_height / self.zoom, 0.0))
+
+    def pan(self, dx, dy):
+        """Move the view by a distance in screen pixels"""
+        self.x += dx / self.zoom
+        self.y += dy / self.zoom
+        self.clamp()
+
+    def zoom_at(self, factor, pos):
+        """Zoom by factor, keeping the world point under the view position pos in place"""
+        world_x, world_y = self.screen_to_world(pos)
+        self.zoom *= factor
+        self.clamp()
+        self.x = world_x - pos[0] / self.zoom
+        self.y = world_y - pos[1] / self.zoom
+        self.clamp()
+
+    def screen_to_world(self, pos):
+        return self.x + pos[0] / self.zoom, self.y + pos[1] / self.zoom
+
+    def world_to_screen(self, x, y):
+        return (x - self.x) * self.zoom, (y - self.y) * self.zoom
+
+    def screen_to_tile(self, pos):
+        """(row, col) of the tile under a game view position, which may be off the map"""
+        world_x, world_y = self.screen_to_world(pos)
+        return int(world_y // TILE_SIZE), int(world_x // TILE_SIZE)
+
+    def tile_rect(self, row, col, rows=1, cols=1):
+        """Screen rect of a block of tiles, with edges rounded so neighbours never leave gaps"""
+        left = int((col * TILE_SIZE - self.x) * self.zoom)
+        top = int((row * TILE_SIZE - self.y) * self.zoom)
+        right = int(((col + cols) * TILE_SIZE - self.x) * self.zoom)
+        bottom = int(((row + rows) * TILE_SIZE - self.y) * self.zoom)
+        return pygame.Rect(left, top, right - left, bottom - top)
+
+    def visible_tiles(self):
+        """(row0, col0, row1, col1), the inclusive range of tiles at least partly in view"""
+        row0 = max(int(self.y // TILE_SIZE), 0)
+        col0 = max(int(self.x // TILE_SIZE), 0)
+        row1 = min(int((self.y + self.view_height / self.zoom) // TILE_SIZE), ROWS - 1)
+        col1 = min(int((self.x + self.view_width / self.zoom) // TILE_SIZE), COLS - 1)
+        return row0, col0, row1, col1
@@ -0,0 +1,163 @@
+from array import array
+from constants import ROWS, COLS, CHANGE_GAS_PRECISION
+
+
+def quantise(gases, precision):
+    """Gas levels in whole steps of precision, rounded like the server's tile records"""
+    return round(gases.o2 / precision), round(gases.co2 / precision), round(gases.n2 / precision)
+
+
+class ChangeSet:
+    """What changed during one tick.
+
+    Tile lists are array('i') of flat tile indices (row * COLS + col), each
+    listed once per kind. Iterating yields the (row, col) of every tile that
+    changed in any way, without repeats.
+    """
+    def __init__(self, tick, gas_tiles, topology_tiles, power_tiles, rooms, pipe_networks, pipes_rebuilt):
+        self.tick = tick
+        self.gas_tiles = gas_tiles  # Gases moved by at least CHANGE_GAS_PRECISION
+        self.topology_tiles = topology_tiles  # Walls, doors, wiring, pipes or components edited
+        self.power_tiles = power_tiles  # Powered state flipped
+        self.rooms = rooms  # Rooms created, or whose aggregate gases or overlay changed
+        self.pipe_networks = pipe_networks  # Networks rebuilt, or whose gases moved
+        self.pipes_rebuilt = pipes_rebuilt  # Every network was replaced, old ones are gone
+
+    def __bool__(self):
+        return bool(self.gas_tiles or self.topology_tiles or self.power_tiles or
+                    self.rooms or self.pipe_networks)
+
+    def __iter__(self):
+        seen = set()
+        for indices in (self.topology_tiles, self.power_tiles, self.gas_tiles):
+            for index in indices:
+                if index not in seen:
+                    seen.add(index)
+                    yield divmod(index, COLS)
+
+
+class ChangeTracker:
+    """Collects changes as the simulation makes them and publishes one ChangeSet per tick.
+
+    The simulation reports what it touched (edited tiles, tiles the gas
+    solver updated, power labels, rooms, pipe networks) and the tracker
+    keeps only what moved past the quantisation threshold since it was last
+    reported. Subscribers are called with each published ChangeSet.
+
+    Nothing is tracked while there are no subscribers, so the simulation
+    pays for change sets only when something consumes them. A new
+    subscriber's first change sets list every tile and room whose gases
+    differ from what was last reported.
+
+    Gases are compared in whole steps of precision, so a tile is listed when
+    a level crosses a rounding boundary, and drift below that is never
+    reported but never lost either.
+    """
+    def __init__(self, precision=CHANGE_GAS_PRECISION):
+        self.precision = precision
+        self.subscribers = []
+        self.gas_levels = array('i', bytes(4 * 3 * ROWS * COLS))  # Last reported o2/co2/n2 per tile
+        self.room_levels = {}
+        self.network_levels = {}
+        self.gas_marked = bytearray(ROWS * COLS)  # Tiles already listed this tick, by kind
+        self.topology_marked = bytearray(ROWS * COLS)
+        self.power_marked = bytearray(ROWS * COLS)
+        self.gas_tiles = self.topology_tiles = self.power_tiles = ()
+        self.clear()
+
+    def clear(self):
+        """Start a new change set, unmarking only the tiles the last one listed"""
+        for marked, tiles in ((self.gas_marked, self.gas_tiles),
+                              (self.topology_marked, self.topology_tiles),
+                              (self.power_marked, self.power_tiles)):
+            for index in tiles:
+                marked[index] = 0
+        self.gas_tiles = array('i')
+        self.topology_tiles = array('i')
+        self.power_tiles = array('i')
+        self.rooms = {}  # Used as an insertion-ordered set
+        self.pipe_networks = {}
+        self.pipes_rebuilt = False
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        self.subscribers.remove(callback)
+
+    def tile_edited(self, row, col):
+        if not self.subscribers:
+            return
+        index = row * COLS + col
+        if not self.topology_marked[index]:
+            self.topology_marked[index] = 1
+            self.topology_tiles.append(index)
+
+    def gases_updated(self, tiles):
+        """Record the tiles among `tiles` whose gases moved past the threshold"""
+        if not self.subscribers:
+            return
+        precision = self.precision
+        levels = self.gas_levels
+        for tile in tiles:
+            gases = tile.gases
+            index = tile.row * COLS + tile.col
+            base = index * 3
+            o2 = round(gases.o2 / precision)
+            co2 = round(gases.co2 / precision)
+            n2 = round(gases.n2 / precision)
+            if o2 != levels[base] or co2 != levels[base + 1] or n2 != levels[base + 2]:
+                levels[base] = o2
+                levels[base + 1] = co2
+                levels[base + 2] = n2
+                if not self.gas_marked[index]:
+                    self.gas_marked[index] = 1
+                    self.gas_tiles.append(index)
+
+    def power_flipped(self, tiles):
+        if not self.subscribers:
+            return
+        for tile in tiles:
+            index = tile.row * COLS + tile.col
+            if not self.power_marked[index]:
+                self.power_marked[index] = 1
+                self.power_tiles.append(index)
+
+    def room_updated(self, room, force=False):
+        """Record a room if it is new, its aggregate gases moved past the threshold or its overlay changed"""
+        if not self.subscribers:
+            return
+        metrics = room.metrics()
+        level = quantise(room.gases, self.precision) + (metrics.overlay_alpha, metrics.status)
+        if force or self.room_levels.get(room) != level:
+            self.room_levels[room] = level
+            self.rooms[room] = None
+
+    def networks_rebuilt(self, networks):
+        if not self.subscribers:
+            return
+        self.pipes_rebuilt = True
+        self.network_levels = {}
+        for network in networks:
+            self.network_updated(network, force=True)
+
+    def network_updated(self, network, force=False):
+        if not self.subscribers:
+            return
+        level = quantise(network.gases, self.precision)
+        if force or self.network_levels.get(network) != level:
+            self.network_levels[network] = level
+            self.pipe_networks[network] = None
+
+    def publish(self, tick):
+        """Close the current tick's change set and hand it to the subscribers"""
+        if not self.subscribers:
+            return
+        if len(self.room_levels) > 2 * len(self.rooms) + 64:
+            # Forget rooms that no longer exist now and then
+            self.room_levels = {room: level for room, level in self.room_levels.items() if room.tiles}
+        changes = ChangeSet(tick, self.gas_tiles, self.topology_tiles, self.power_tiles,
+                            list(self.rooms), list(self.pipe_networks), self.pipes_rebuilt)
+        self.clear()
+        for callback in self.subscribers:
+            callback(changes)
@@ -1,11 +1,10 @@
 from gas import GasCell
 from constants import (
     MIN_N2_FOR_ENGINE, PLANT_O2_RATE, PLANT_CO2_CONSUMPTION, 
-    SPAC_N2_RATE, ROWS, COLS, TILE_SIZE, CYAN  # Add TILE_SIZE here
+    SPAC_N2_RATE, ROWS, COLS, TILE_SIZE, CYAN, GAS_COLORS, PIPE_COLOR,  # Add TILE_SIZE here
+    PARTICLE_SEED, VENT_PARTICLE_BUDGET
 )
-from particle import Particle  # Add this import
-import random
-import math
+from particle import ParticleEmitter
 
 class Engine:
     def __init__(self, room):
@@ -41,17 +40,139 @@ class OxygenGenerator:
             self.tile.gases.add_gas('O2', self.generation_rate)
 
 class PipeNetwork:
+    """Connected pipe tiles, each holding its own gas.
+
+    The pipe graph is stored as an edge list built once per topology change,
+    and flow() moves gas along it from high to low pressure.
+    """
     def __init__(self):
-        self.gases = GasCell()
+        self.gases = GasCell()  # Total over the whole network
+        self.dominant = None  # Gas the network holds most of, cached by dominant_gas()
+        self.dominant_stale = True  # Set whenever the network's total gases change
         self.tiles = []
-
-    def add_tile(self, tile):
+        self.index = {}
+        # Per-tile gas, indexed like self.tiles
+        self.o2 = []
+        self.co2 = []
+        self.n2 = []
+        # Each pipe connection once, as parallel index lists
+        self.edges_a = []
+        self.edges_b = []
+
+    def add_tile(self, tile, gases=(0, 0, 0)):
+        o2, co2, n2 = gases
+        self.index[tile] = len(self.tiles)
         self.tiles.append(tile)
+        self.o2.append(o2)
+        self.co2.append(co2)
+        self.n2.append(n2)
+        self.gases.o2 += o2
+        self.gases.co2 += co2
+        self.gases.n2 += n2
+        self.dominant_stale = True
         tile.pipe_network = self
 
-    def remove_tile(self, tile):
-        self.tiles.remove(tile)
-        tile.pipe_network = None
+    def build_edges(self):
+        self.edges_a = []
+        self.edges_b = []
+        for i, tile in enumerate(self.tiles):
+            for dr, dc in [(0, 1), (1, 0)]:
+                nr, nc = tile.row + dr, tile.col + dc
+                if 0 <= nr < ROWS and 0 <= nc < COLS:
+                    j = self.index.get(tile.simulator.grid[nr][nc])
+                    if j is not None:
+                        self.edges_a.append(i)
+                        self.edges_b.append(j)
+
+    def tile_gases(self, tile):
+        i = self.index[tile]
+        return self.o2[i], self.co2[i], self.n2[i]
+
+    def add_gas(self, tile, gas_type: str, amount: float):
+        """Inject gas into the pipe at the given tile"""
+        i = self.index[tile]
+        species = getattr(self, gas_type.lower())
+        species[i] += amount
+        self.gases.add_gas(gas_type, amount)
+        self.dominant_stale = True
+
+    def take_gas(self, tile, gas_type: str, amount: float) -> float:
+        """Remove up to amount of gas from the pipe at the given tile, returning what was taken"""
+        i = self.index[tile]
+        species = getattr(self, gas_type.lower())
+        taken = min(species[i], amount)
+        species[i] -= taken
+        self.gases.consume_gas(gas_type, taken)
+        self.dominant_stale = True
+        return taken
+
+    def dominant_gas(self):
+        """'o2', 'co2' or 'n2', whichever the network holds most of, or None when it is empty.
+
+        Worked out again only after the network's gases change. Flow moves gas
+        within the network without changing its total, so it leaves this alone.
+        """
+        if self.dominant_stale:
+            gases = self.gases
+            self.dominant = None
+            if gases.total() > 0:
+                top = max(gases.o2, gases.co2, gases.n2)
+                self.dominant = "o2" if top == gases.o2 else "co2" if top == gases.co2 else "n2"
+            self.dominant_stale = False
+        return self.dominant
+
+    def pipe_color(self):
+        """Colour of the network's pipes, that of its predominant gas"""
+        gas = self.dominant_gas()
+        return GAS_COLORS[gas] if gas else PIPE_COLOR
+
+    def flow(self, rate, substeps):
+        """Pressure-driven flow along every pipe connection.
+
+        Each connection carries rate * pressure difference per substep with the
+        upstream tile's composition. All connections are evaluated from the
+        same state before any tile is updated. A tile has at most four
+        connections, so rate <= 0.25 means no tile gives away more gas than it
+        holds; nothing is clamped, and total gas is conserved exactly.
+
+        Upwind flow depends on the direction of each pressure difference, so
+        there is no single linear solve for it like implicit_diffuse's. This
+        runs as explicit substeps over the edge list, a Python loop per edge
+        and substep: the cost grows with the network's size times substeps.
+        """
+        if not 0 <= rate <= 0.25:
+            raise ValueError(f"Pipe flow rate must be between 0 and 0.25, got {rate}")
+        o2, co2, n2 = self.o2, self.co2, self.n2
+        edges = list(zip(self.edges_a, self.edges_b))
+        if not edges:
+            return
+
+        for _ in range(substeps):
+            pressure = [a + b + c for a, b, c in zip(o2, co2, n2)]
+            d_o2 = [0.0] * len(o2)
+            d_co2 = [0.0] * len(o2)
+            d_n2 = [0.0] * len(o2)
+            for a, b in edges:
+                q = rate * (pressure[a] - pressure[b])
+                if q == 0:
+                    continue
+                up = a if q > 0 else b
+                share = abs(q) / pressure[up]
+                f_o2 = o2[up] * share
+                f_co2 = co2[up] * share
+                f_n2 = n2[up] * share
+                if up == b:
+                    f_o2, f_co2, f_n2 = -f_o2, -f_co2, -f_n2
+                d_o2[a] -= f_o2
+                d_co2[a] -= f_co2
+                d_n2[a] -= f_n2
+                d_o2[b] += f_o2
+                d_co2[b] += f_co2
+                d_n2[b] += f_n2
+            for i in range(len(o2)):
+                o2[i] += d_o2[i]
+                co2[i] += d_co2[i]
+                n2[i] += d_n2[i]
 
     def total_pressure(self):
         return self.gases.pressure()
@@ -60,42 +181,28 @@ class BaseVentilation:
     def __init__(self, room):
         self.room = room
         self.transfer_rate = 1.0
-        self.last_search_time = 0
-        self.search_interval = 30
-        self.connected_pipes = []
+        self.pipe_network = None
+        self.emitter = None
+        self.particle_style = {}  # Direction, start offset and fade of this vent's particles
 
     def find_connected_pipes(self):
-        """Find connected pipes and assign them to the same PipeNetwork."""
-        visited = set()
-        to_check = [(self.tile.row, self.tile.col)]
-        self.pipe_network = None
+        """Use the pipe network of the vent's own tile, kept up to date by the simulator"""
+        self.pipe_network = self.tile.pipe_network if self.tile.pipe else None
 
-        while to_check:
-            row, col = to_check.pop()
-            if (row, col) in visited:
-                continue
-
-            visited.add((row, col))
-            tile = self.tile.simulator.grid[row][col]
-
-            if tile.pipe:
-                if tile.pipe_network:
-                    self.pipe_network = tile.pipe_network
-                else:
-                    if not self.pipe_network:
-                        self.pipe_network = PipeNetwork()
-                    self.pipe_network.add_tile(tile)
-
-                # Add neighboring pipes to check
-                for dr, dc in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
-                    nr, nc = row + dr, col + dc
-                    if 0 <= nr < ROWS and 0 <= nc < COLS:
-                        neighbor = self.tile.simulator.grid[nr][nc]
-                        if neighbor.pipe and (nr, nc) not in visited:
-                            to_check.append((nr, nc))
+    def particle_emitter(self):
+        """This vent's emitter, seeded from its position so particle runs are reproducible"""
+        particles = self.tile.simulator.particles
+        if self.emitter is None or self.emitter.store is not particles:
+            seed = f"{PARTICLE_SEED}:{self.tile.row}:{self.tile.col}"
+            self.emitter = ParticleEmitter(particles, seed, VENT_PARTICLE_BUDGET, **self.particle_style)
+        return self.emitter
 
 class InputVent(BaseVentilation):
     """Pulls gases from local environment into pipes"""
+    def __init__(self, room):
+        super().__init__(room)
+        self.particle_style = {"inward": True, "offset": 5, "reverse_fade": True}
+
     def update(self):
         if not hasattr(self, 'tile'):
             return
@@ -112,54 +219,23 @@ class InputVent(BaseVentilation):
                     gas_per_tile = transfer_amount / len(self.tile.room.tiles)
                     for tile in self.tile.room.tiles:
                         tile.gases.consume_gas(gas_type, gas_per_tile)
-                    # Add gas to pipe network
-                    self.pipe_network.gases.add_gas(gas_type, transfer_amount)
+                    # Add gas to the pipe under the vent
+                    self.pipe_network.add_gas(self.tile, gas_type, transfer_amount)
 
             # Only spawn particles if actual gas transfer occurred
             if self.pipe_network.gases.total() > 0:
-                self.spawn_particles(aspiring=True)
+                self.spawn_particles()
 
-    def spawn_particles(self, aspiring):
-        simulator = self.tile.simulator
+    def spawn_particles(self):
         x = self.tile.x + TILE_SIZE // 2
         y = self.tile.y + TILE_SIZE // 2
 
-        # Get gas composition from surrounding tiles
-        total_gas = 0
-        o2_ratio = co2_ratio = n2_ratio = 0
-        
-        for dr in [-1, 0, 1]:
-            for dc in [-1, 0, 1]:
-                if dr == 0 and dc == 0:
-                    continue
-                new_row = self.tile.row + dr
-                new_col = self.tile.col + dc
-                if (0 <= new_row < ROWS and 0 <= new_col < COLS):
-                    source_tile = self.tile.simulator.grid[new_row][new_col]
-                    total_gas += source_tile.gases.total()
-                    o2_ratio += source_tile.gases.o2
-                    co2_ratio += source_tile.gases.co2
-                    n2_ratio += source_tile.gases.n2
+        # Colour by the room's predominant gas, shared with every other room consumer
+        metrics = self.tile.room.metrics()
 
         # Only spawn particles if there are gases present
-        if total_gas > 0:
-            # Determine predominant gas color
-            if max(o2_ratio, co2_ratio, n2_ratio) == o2_ratio:
-                color = (100, 200, 255)  # Blue for O2
-            elif max(o2_ratio, co2_ratio, n2_ratio) == co2_ratio:
-                color = (255, 100, 100)  # Red for CO2
-            else:
-                color = (200, 200, 200)  # Gray for N2
-
-            for _ in range(2):
-                angle = random.uniform(0, 2 * math.pi)
-                speed = random.uniform(0.5, 1.0)
-                vx = math.cos(angle) * speed * (-1 if aspiring else 1)
-                vy = math.sin(angle) * speed * (-1 if aspiring else 1)
-                particle = Particle(
-                    x + vx * 5, y + vy * 5, vx, vy, 
-                    lifespan=30, color=color, reverse_fade=True)
-                simulator.particles.append(particle)
+        if metrics.total > 0:
+            self.particle_emitter().emit([(x, y, GAS_COLORS[metrics.dominant], 2, (0.5, 1.0), 30)])
 
 class OutputVent(BaseVentilation):
     """Pushes gases from pipes into room"""
@@ -172,60 +248,32 @@ class OutputVent(BaseVentilation):
         if self.pipe_network and self.tile.room:
             gas_transferred = False  # Flag to track if any gas was transferred
             
-            # Push gases from pipe network to room
+            # Push gases that have reached the vent's pipe into the room
             for gas_type in ['O2', 'CO2', 'N2']:
-                gas_amount = getattr(self.pipe_network.gases, gas_type.lower())
-                if gas_amount > 0:
-                    # Transfer a portion of the gas
-                    transfer_amount = min(gas_amount, self.transfer_rate)
-                    if transfer_amount > 0:
-                        # Remove gas from pipe network
-                        self.pipe_network.gases.consume_gas(gas_type, transfer_amount)
+                # Transfer a portion of the gas
+                transfer_amount = self.pipe_network.take_gas(self.tile, gas_type, self.transfer_rate)
+                if transfer_amount > 0:
+                    # Evenly distribute gas to all room tiles
+                    gas_per_tile = transfer_amount / len(self.tile.room.tiles)
+                    for room_tile in self.tile.room.tiles:
+                        room_tile.gases.add_gas(gas_type, gas_per_tile)
                         
-                        # Evenly distribute gas to all room tiles
-                        gas_per_tile = transfer_amount / len(self.tile.room.tiles)
-                        for room_tile in self.tile.room.tiles:
-                            room_tile.gases.add_gas(gas_type, gas_per_tile)
-                            
-                        gas_transferred = True  # Set flag if gas was transferred
+                    gas_transferred = True  # Set flag if gas was transferred
 
             # Spawn particles if any gas was transferred
             if gas_transferred:
-                self.spawn_particles(aspiring=False)
+                self.spawn_particles()
 
-    def spawn_particles(self, aspiring):
-        simulator = self.tile.simulator
+    def spawn_particles(self):
         x = self.tile.x + TILE_SIZE // 2
         y = self.tile.y + TILE_SIZE // 2
 
-        # Get gas composition from pipe network
+        # Particles take the colour of the pipe network's predominant gas
         if self.pipe_network:
-            o2_amount = self.pipe_network.gases.o2
-            co2_amount = self.pipe_network.gases.co2
-            n2_amount = self.pipe_network.gases.n2
-            total_gas = o2_amount + co2_amount + n2_amount
-
-            if total_gas > 0:  # Only spawn if there's gas in the network
-                # Determine predominant gas color based on pipe network gases
-                if max(o2_amount, co2_amount, n2_amount) == o2_amount:
-                    color = (100, 200, 255)  # Blue for O2
-                elif max(o2_amount, co2_amount, n2_amount) == co2_amount:
-                    color = (255, 100, 100)  # Red for CO2
-                else:
-                    color = (200, 200, 200)  # Gray for N2
-
+            gas = self.pipe_network.dominant_gas()
+            if gas:  # Only spawn if there's gas in the network
                 # Spawn multiple particles for better visibility
-                for _ in range(3):  # Increased number of particles
-                    angle = random.uniform(0, 2 * math.pi)
-                    speed = random.uniform(1.0, 2.0)  # Increased speed range
-                    vx = math.cos(angle) * speed * (-1 if aspiring else 1)
-                    vy = math.sin(angle) * speed * (-1 if aspiring else 1)
-                    particle = Particle(
-                        x, y, vx, vy, 
-                        lifespan=45,  # Increased lifespan
-                        color=color, 
-                        reverse_fade=False)
-                    simulator.particles.append(particle)
+                self.particle_emitter().emit([(x, y, GAS_COLORS[gas], 3, (1.0, 2.0), 45)])
 
 class Plant:
     def __init__(self, room):
@@ -257,5 +305,5 @@ class Spac12(BaseVentilation):
         self.find_connected_pipes()  # Always find connected pipes
 
         if self.pipe_network:
-            # Generate N2 and add it to the pipe network
-            self.pipe_network.gases.add_gas('N2', self.generation_rate)
+            # Generate N2 into the pipe under the SPAC
+            self.pipe_network.add_gas(self.tile, 'N2', self.generation_rate)
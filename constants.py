@@ -5,7 +5,11 @@ WIDTH, HEIGHT = 800, 600
 GRID_SIZE = 600
 ROWS, COLS = 20, 20
 TILE_SIZE = GRID_SIZE // COLS
+CHUNK_SIZE = 8  # Tiles per side of a map chunk used for region queries
 SIDEBAR_WIDTH = WIDTH /4
+CAMERA_MAX_TILE_PIXELS = 64  # Closest zoom, in screen pixels per tile
+CAMERA_ZOOM_STEP = 1.25  # Zoom factor per mouse wheel notch
+CAMERA_PAN_SPEED = 10  # Screen pixels per frame while an arrow key is held
 MAX_PRESSURE = 10.0
 GAS_SPREAD_RATE = 0.05
 MACHINE_DAMAGE_RATE = 0.05
@@ -15,6 +19,74 @@ PLANT_O2_RATE = 0.1
 PLANT_CO2_CONSUMPTION = 0.2
 SPAC_N2_RATE = 2.0  # Changed from SPAC_CO2_RATE
 PIPE_COLOR = (168, 132, 80)  # Warmer brown
+# Particle and pipe colours for the predominant gas
+GAS_COLORS = {
+    'o2': (100, 200, 255),  # Blue for O2
+    'co2': (255, 100, 100),  # Red for CO2
+    'n2': (200, 200, 200),  # Gray for N2
+}
+# Vent particles
+PARTICLE_LIMIT = 2000  # Most particles alive at once across the station
+VENT_PARTICLE_BUDGET = 60  # Most particles one vent may have alive at once
+PARTICLE_SEED = 0  # Vent emitters derive their seeds from this and their position
+PIPE_FLOW_RATE = 0.25  # Flow per pressure difference between pipe tiles, at most 0.25 (checked by PipeNetwork.flow)
+PIPE_FLOW_SUBSTEPS = 8  # Flow passes per gas update
+VACUUM_DISSIPATION_RATE = 0.5  # Faster gas dissipation in vacuum
+
+# Gas diffusion solver
+GAS_SOLVER = "explicit"  # "explicit" or "implicit" (stable for any GAS_TIME_STEP)
+GAS_TIME_STEP = 1.0  # Diffusion time per gas update, in explicit steps
+IMPLICIT_MAX_ITERATIONS = 100
+IMPLICIT_TOLERANCE = 1e-4  # Largest per-tile change that counts as converged
+
+# Coarse-grid gas level of detail
+GAS_LOD_ENABLED = False
+GAS_LOD_BLOCK_SIZE = 4  # Tiles per side of a coarse block
+GAS_LOD_TOLERANCE = 0.05  # Max per-gas difference for a block to count as uniform
+GAS_LOD_RECHECK_INTERVAL = 8  # Gas updates to wait before retrying to coarsen a block
+
+# Run the simulation on a worker thread, drawing snapshots it publishes each tick
+SIM_THREAD_ENABLED = False
+SIM_TICK_RATE = 60  # Ticks per second on the worker thread
+
+# Per-tick change sets (changes.py)
+CHANGE_GAS_PRECISION = 0.1  # Gas changes smaller than this are left out of a tick's change set
+
+# Live state export to a memory-mapped file (export.py)
+EXPORT_ENABLED = False
+EXPORT_PATH = "station.state"
+EXPORT_INTERVAL = 5  # Ticks between updates of the file, one gas update
+
+# Prometheus-style metrics (metrics.py)
+METRICS_ENABLED = False
+METRICS_INTERVAL = 60  # Ticks between samples of the gauges and rewrites of the metrics text
+METRICS_FILE = None  # Path of a .prom file for a textfile collector, or None
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9777  # HTTP port serving /metrics, or None
+
+# Slow frame profiler (profiler.py)
+PROFILE_SLOW_FRAMES = False  # Profile every frame and keep those over budget as .pstats files
+PROFILE_FRAME_BUDGET_MS = 33  # Frames taking longer than this are kept
+PROFILE_DIR = "profiles"
+PROFILE_MAX_DUMPS = 50  # Stop after this many slow frames so a bad session cannot fill the disk
+
+# Adaptive frame budget (framebudget.py)
+FRAME_BUDGET_ENABLED = True  # Shed particles, animations and redraws while frames run long
+FRAME_BUDGET_MS = 15  # Work per frame that still leaves room for 60 FPS
+FRAME_BUDGET_DEGRADE_FRAMES = 30  # Frames over budget before the next degradation switches on
+FRAME_BUDGET_RECOVER_FRAMES = 180  # Frames well under budget before the last one switches off
+FRAME_BUDGET_RECOVER_RATIO = 0.6  # "Well under" is below this fraction of the budget
+
+# Simulation server for remote viewers
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 7777
+SERVER_GAS_PRECISION = 0.1  # Gas changes smaller than this are not sent to viewers
+SERVER_MAX_CLIENT_BUFFER = 8 * 1024 * 1024  # Bytes a viewer may fall behind before it is dropped
+
+# Background autosave
+AUTOSAVE_ENABLED = True
+AUTOSAVE_INTERVAL = 1800  # Ticks between autosaves (30 s at 60 FPS)
+AUTOSAVE_PATH = "autosave.json"
 
 # Base Colors
 WHITE = (255, 255, 255)
@@ -0,0 +1,224 @@
+from array import array
+from constants import ROWS, COLS
+
+
+class GasAdjacency:
+    """Which open tiles exchange gas with which, for one version of the topology.
+
+    Open tiles are those without walls, doors or pipes, numbered by flat index
+    (row * COLS + col). Tile i's open neighbours are
+    neighbors[offsets[i]:offsets[i + 1]], in compressed sparse row form. Every
+    adjacent pair is also listed once as an edge (edge_a[e] < edge_b[e]) with
+    weight 1 / max(degree) of its two tiles. The exchange across an edge is
+    then the same seen from either side, and no tile exchanges more than
+    rate * dt in total, just as before (exactly that much in open space).
+    """
+    def __init__(self, grid, topology_version=None):
+        self.topology_version = topology_version
+        self.tiles = [tile for row in grid for tile in row]
+        is_open = bytearray(not (tile.wall or tile.door or tile.pipe) for tile in self.tiles)
+
+        offsets = array('i', [0])
+        neighbors = array('i')
+        for i in range(ROWS * COLS):
+            if is_open[i]:
+                row, col = divmod(i, COLS)
+                if col + 1 < COLS and is_open[i + 1]:
+                    neighbors.append(i + 1)
+                if row + 1 < ROWS and is_open[i + COLS]:
+                    neighbors.append(i + COLS)
+                if col > 0 and is_open[i - 1]:
+                    neighbors.append(i - 1)
+                if row > 0 and is_open[i - COLS]:
+                    neighbors.append(i - COLS)
+            offsets.append(len(neighbors))
+        self.offsets = offsets
+        self.neighbors = neighbors
+        self.degree = array('i', (offsets[i + 1] - offsets[i] for i in range(ROWS * COLS)))
+
+        degree = self.degree
+        self.edge_a = array('i')
+        self.edge_b = array('i')
+        self.weight = array('d')
+        for i in range(ROWS * COLS):
+            for j in neighbors[offsets[i]:offsets[i + 1]]:
+                if j > i:
+                    self.edge_a.append(i)
+                    self.edge_b.append(j)
+                    self.weight.append(1 / max(degree[i], degree[j]))
+        self.coupled = array('i', (i for i in range(ROWS * COLS) if degree[i]))
+        self.full_edges = None
+        self.full_system = None
+
+    def edges_touching(self, tiles):
+        """The edges with at least one end in `tiles`, and every tile those edges reach.
+
+        Returns the touched tiles' flat indices and the edges as positions
+        in that list, so callers only need values for the touched tiles.
+        Cached for the whole grid, which is what runs without the gas LOD.
+        """
+        if len(tiles) >= len(self.tiles):
+            if self.full_edges is None:
+                position = {i: n for n, i in enumerate(self.coupled)}
+                self.full_edges = (array('i', (position[i] for i in self.edge_a)),
+                                   array('i', (position[j] for j in self.edge_b)),
+                                   self.weight, self.coupled)
+            return self.full_edges
+
+        offsets, neighbors, degree = self.offsets, self.neighbors, self.degree
+        active = bytearray(ROWS * COLS)
+        for tile in tiles:
+            active[tile.row * COLS + tile.col] = 1
+
+        edge_a, edge_b, weight = array('i'), array('i'), array('d')
+        touched = array('i')
+        position = {}
+        for tile in tiles:
+            i = tile.row * COLS + tile.col
+            if not degree[i]:
+                continue
+            a = position.get(i)
+            if a is None:
+                a = position[i] = len(touched)
+                touched.append(i)
+            for j in neighbors[offsets[i]:offsets[i + 1]]:
+                # List an edge between two active tiles once, from its lower end
+                if j > i or not active[j]:
+                    b = position.get(j)
+                    if b is None:
+                        b = position[j] = len(touched)
+                        touched.append(j)
+                    edge_a.append(a)
+                    edge_b.append(b)
+                    weight.append(1 / max(degree[i], degree[j]))
+        return edge_a, edge_b, weight, touched
+
+    def implicit_system(self, tiles, scale):
+        """The parts of implicit_diffuse's system that do not depend on the gases.
+
+        The unknowns are the open tiles in `tiles` followed by their open
+        neighbours outside it, coupled through the same edges explicit_diffuse
+        uses: those with at least one end in `tiles`. Returns the unknowns'
+        flat indices, each one's diagonal, its (position, k) links, and the
+        red and black positions. Cached for the whole grid, which is what runs
+        without the gas LOD.
+        """
+        full = len(tiles) >= len(self.tiles)
+        if full and self.full_system and self.full_system[0] == scale:
+            return self.full_system[1]
+
+        offsets, neighbors, degree = self.offsets, self.neighbors, self.degree
+        coupled = [tile.row * COLS + tile.col for tile in tiles if degree[tile.row * COLS + tile.col]]
+        active = len(coupled)
+        position = {i: n for n, i in enumerate(coupled)}
+        diag = [1.0] * active
+        links = [[] for _ in range(active)]
+        for n in range(active):
+            i = coupled[n]
+            for j in neighbors[offsets[i]:offsets[i + 1]]:
+                k = scale / max(degree[i], degree[j])
+                diag[n] += k
+                m = position.get(j)
+                if m is None:
+                    # A neighbour outside `tiles` (a coarse LOD block) is solved for too,
+                    # exchanging only with this side, so the flux across is conserved
+                    m = position[j] = len(coupled)
+                    coupled.append(j)
+                    diag.append(1.0)
+                    links.append([])
+                if m >= active:
+                    diag[m] += k
+                    links[m].append((n, k))
+                links[n].append((m, k))
+        links = [tuple(inner) for inner in links]
+
+        # Neighbours on a 4-connected grid always have the opposite colour, so each
+        # half-sweep only reads values from the other half
+        red = [n for n, i in enumerate(coupled) if sum(divmod(i, COLS)) % 2 == 0]
+        black = [n for n, i in enumerate(coupled) if sum(divmod(i, COLS)) % 2 == 1]
+        system = (coupled, diag, links, red, black)
+        if full:
+            self.full_system = (scale, system)
+        return system
+
+
+def explicit_diffuse(adjacency, tiles, rate, dt):
+    """Forward Euler gas diffusion over the adjacency's edges, in place.
+
+    Each edge moves rate * dt * weight * (x_b - x_a) from one end to the
+    other in a single batched pass over the edge list, so what one tile gains
+    the other loses and total gas is conserved to rounding. Stays stable and
+    non-negative while rate * dt <= 1. Only edges touching `tiles` are used;
+    coarse LOD blocks outside it still trade gas with their fine neighbours.
+    Returns the flat indices of every tile it wrote.
+    """
+    edge_a, edge_b, weight, touched = adjacency.edges_touching(tiles)
+    # Values only for the touched tiles, indexed by position in `touched`
+    gases = [adjacency.tiles[i].gases for i in touched]
+    o2 = [cell.o2 for cell in gases]
+    co2 = [cell.co2 for cell in gases]
+    n2 = [cell.n2 for cell in gases]
+    new_o2, new_co2, new_n2 = list(o2), list(co2), list(n2)
+
+    scale = rate * dt
+    for a, b, w in zip(edge_a, edge_b, weight):
+        k = scale * w
+        flux = (o2[b] - o2[a]) * k
+        new_o2[a] += flux
+        new_o2[b] -= flux
+        flux = (co2[b] - co2[a]) * k
+        new_co2[a] += flux
+        new_co2[b] -= flux
+        flux = (n2[b] - n2[a]) * k
+        new_n2[a] += flux
+        new_n2[b] -= flux
+
+    for n, cell in enumerate(gases):
+        cell.o2, cell.co2, cell.n2 = new_o2[n], new_co2[n], new_n2[n]
+    return touched
+
+
+def implicit_diffuse(adjacency, tiles, rate, dt, max_iterations, tolerance):
+    """Backward Euler gas diffusion over the open tiles in `tiles`, in place.
+
+    Uses the same edges and weights as explicit_diffuse, with
+    k_ij = dt * rate * weight_ij, and solves
+
+        (1 + sum_j k_ij) * x_i - sum_j k_ij * x_j = x_i_old
+
+    with red-black Gauss-Seidel. The system is symmetric and strictly
+    diagonally dominant for any dt, so the iteration always converges, never
+    produces negative gas however large the step, and conserves total gas
+    once converged. Open tiles next to `tiles` but not in it (coarse LOD
+    blocks) are solved for as well, trading gas only with `tiles`, so what
+    crosses the border leaves one side and reaches the other. Returns the
+    flat indices of every tile it wrote.
+    """
+    all_tiles = adjacency.tiles
+    coupled, diag, links, red, black = adjacency.implicit_system(tiles, dt * rate)
+    open_tiles = [all_tiles[i] for i in coupled]
+    o2 = [tile.gases.o2 for tile in open_tiles]
+    co2 = [tile.gases.co2 for tile in open_tiles]
+    n2 = [tile.gases.n2 for tile in open_tiles]
+    rhs_o2, rhs_co2, rhs_n2 = list(o2), list(co2), list(n2)
+
+    for _ in range(max_iterations):
+        change = 0.0
+        for group in (red, black):
+            for n in group:
+                sum_o2, sum_co2, sum_n2 = rhs_o2[n], rhs_co2[n], rhs_n2[n]
+                for m, k in links[n]:
+                    sum_o2 += k * o2[m]
+                    sum_co2 += k * co2[m]
+                    sum_n2 += k * n2[m]
+                d = diag[n]
+                new_o2, new_co2, new_n2 = sum_o2 / d, sum_co2 / d, sum_n2 / d
+                change = max(change, abs(new_o2 - o2[n]), abs(new_co2 - co2[n]), abs(new_n2 - n2[n]))
+                o2[n], co2[n], n2[n] = new_o2, new_co2, new_n2
+        if change < tolerance:
+            break
+
+    for n, tile in enumerate(open_tiles):
+        gases = tile.gases
+        gases.o2, gases.co2, gases.n2 = o2[n], co2[n], n2[n]
+    return coupled
@@ -5,6 +5,11 @@ class Mode(Enum):
     INSPECT = "Inspect"
     PLAY = "Play"
 
+class Shape(Enum):
+    FREEHAND = "Freehand"
+    LINE = "Line"
+    RECT = "Rectangle"
+
 class Tool(Enum):
     # Construction
     WALL = "Wall"
@@ -22,6 +27,10 @@ class Tool(Enum):
     PLANT = "Plant"
     SPAC = "SPAC-12"
     
+    # Prefabs
+    CAPTURE = "Capture"
+    STAMP = "Stamp"
+
     # Utility
     DELETE = "Delete"
 
@@ -31,5 +40,6 @@ class Tool(Enum):
             "Construction": [Tool.WALL, Tool.DOOR],
             "Power": [Tool.WIRE, Tool.ENGINE],
             "Life Support": [Tool.OXYGEN, Tool.VENT_IN, Tool.VENT_OUT, Tool.PIPE, Tool.PLANT, Tool.SPAC],  # Update this
+            "Prefabs": [Tool.CAPTURE, Tool.STAMP],
             "Utility": [Tool.DELETE]
         }
@@ -0,0 +1,194 @@
+"""Read-only live state export through a memory-mapped file.
+
+The simulator rewrites the file in place every EXPORT_INTERVAL ticks, so
+dashboards and analysis tools can watch a running station by mapping it,
+with no sockets and no work for the simulation beyond the copy itself.
+
+Layout, little-endian:
+
+    header (HEADER_SIZE bytes): magic, format version, rows, cols,
+        room count, sequence (u64), tick (u64)
+    o2, co2, n2: float32[rows * cols] each, row-major
+    room:        int32[rows * cols], index of the tile's room or -1
+    flags:       uint8[rows * cols], the WALL/DOOR/WIRE/PIPE/POWERED/IN_ROOM
+                 bits from protocol.py
+
+The sequence works as a seqlock: it is odd while the writer is updating the
+file and even once it is done. A reader copies what it needs between two
+reads of the sequence and retries unless both were the same even number,
+as StateReader.read does. Watch one from the command line with
+
+    python export.py station.state
+"""
+import mmap
+import struct
+import sys
+import time
+from array import array
+from protocol import WALL, DOOR, WIRE, PIPE, POWERED, IN_ROOM
+
+MAGIC = b"PRSXSTAT"
+FORMAT_VERSION = 1
+
+HEADER = struct.Struct("<8sIIIIQQ")
+HEADER_SIZE = 64
+ROOM_COUNT_OFFSET = struct.calcsize("<8sIII")
+SEQUENCE_OFFSET = struct.calcsize("<8sIIII")
+TICK_OFFSET = SEQUENCE_OFFSET + 8
+
+
+def section_offsets(rows, cols):
+    """Byte offsets of the o2, co2, n2, room and flags sections, and the file size"""
+    count = rows * cols
+    o2 = HEADER_SIZE
+    co2 = o2 + 4 * count
+    n2 = co2 + 4 * count
+    room = n2 + 4 * count
+    flags = room + 4 * count
+    return o2, co2, n2, room, flags, flags + count
+
+
+class StateExport:
+    """Writes the simulator's state into a memory-mapped file for outside readers"""
+    def __init__(self, simulator, path):
+        self.simulator = simulator
+        self.path = path
+        self.rows = len(simulator.grid)
+        self.cols = len(simulator.grid[0])
+        self.offsets = section_offsets(self.rows, self.cols)
+        self.sequence = 0
+
+        # Size the file before mapping it; readers may already have the old one open
+        with open(path, "a+b") as f:
+            f.truncate(self.offsets[-1])
+        self.file = open(path, "r+b")
+        self.map = mmap.mmap(self.file.fileno(), self.offsets[-1])
+        HEADER.pack_into(self.map, 0, MAGIC, FORMAT_VERSION, self.rows, self.cols, 0, 0, 0)
+        self.publish()
+
+    def publish(self):
+        """Copy the current state into the file"""
+        simulator = self.simulator
+        room_ids = {room: index for index, room in enumerate(simulator.rooms)}
+        o2, co2, n2 = array('f'), array('f'), array('f')
+        rooms = array('i')
+        flags = bytearray()
+        for grid_row in simulator.grid:
+            for tile in grid_row:
+                gases = tile.gases
+                o2.append(gases.o2)
+                co2.append(gases.co2)
+                n2.append(gases.n2)
+                rooms.append(room_ids.get(tile.room, -1))
+                flags.append((WALL if tile.wall else 0) | (DOOR if tile.door else 0) | (WIRE if tile.wire else 0) |
+                             (PIPE if tile.pipe else 0) | (POWERED if tile.powered else 0) |
+                             (IN_ROOM if tile.room else 0))
+        if sys.byteorder != "little":
+            for section in (o2, co2, n2, rooms):
+                section.byteswap()
+
+        # Everything is built before the sequence goes odd, so readers retry as little as possible
+        self.sequence += 1
+        struct.pack_into("<Q", self.map, SEQUENCE_OFFSET, self.sequence)
+        o2_at, co2_at, n2_at, room_at, flags_at, end = self.offsets
+        self.map[o2_at:co2_at] = o2.tobytes()
+        self.map[co2_at:n2_at] = co2.tobytes()
+        self.map[n2_at:room_at] = n2.tobytes()
+        self.map[room_at:flags_at] = rooms.tobytes()
+        self.map[flags_at:end] = flags
+        struct.pack_into("<I", self.map, ROOM_COUNT_OFFSET, len(simulator.rooms))
+        struct.pack_into("<Q", self.map, TICK_OFFSET, simulator.update_counter)
+        self.sequence += 1
+        struct.pack_into("<Q", self.map, SEQUENCE_OFFSET, self.sequence)
+
+    def close(self):
+        self.map.flush()
+        self.map.close()
+        self.file.close()
+
+
+class StateSnapshot:
+    """One consistent copy of an exported state"""
+    def __init__(self, tick, rows, cols, room_count, o2, co2, n2, rooms, flags):
+        self.tick = tick
+        self.rows = rows
+        self.cols = cols
+        self.room_count = room_count
+        self.o2 = o2
+        self.co2 = co2
+        self.n2 = n2
+        self.rooms = rooms
+        self.flags = flags
+
+
+class StateReader:
+    """Maps an exported state file read-only and takes consistent snapshots of it"""
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.rows, self.cols, _, _, _ = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a station state export")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"State export format {version} is not supported, expected {FORMAT_VERSION}")
+        self.offsets = section_offsets(self.rows, self.cols)
+
+    def read(self, retries=1000):
+        """Copy the state, retrying while the writer is part way through an update"""
+        o2_at, co2_at, n2_at, room_at, flags_at, end = self.offsets
+        for _ in range(retries):
+            sequence = struct.unpack_from("<Q", self.map, SEQUENCE_OFFSET)[0]
+            if sequence % 2:
+                time.sleep(0)
+                continue
+            room_count = struct.unpack_from("<I", self.map, ROOM_COUNT_OFFSET)[0]
+            tick = struct.unpack_from("<Q", self.map, TICK_OFFSET)[0]
+            o2, co2, n2, rooms = array('f'), array('f'), array('f'), array('i')
+            o2.frombytes(self.map[o2_at:co2_at])
+            co2.frombytes(self.map[co2_at:n2_at])
+            n2.frombytes(self.map[n2_at:room_at])
+            rooms.frombytes(self.map[room_at:flags_at])
+            flags = self.map[flags_at:end]
+            if struct.unpack_from("<Q", self.map, SEQUENCE_OFFSET)[0] != sequence:
+                continue
+            if sys.byteorder != "little":
+                for section in (o2, co2, n2, rooms):
+                    section.byteswap()
+            return StateSnapshot(tick, self.rows, self.cols, room_count, o2, co2, n2, rooms, flags)
+        raise TimeoutError("State export kept changing while it was read")
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Watch a running station's exported state.")
+    parser.add_argument("path", help="state export file (EXPORT_PATH)")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between reports (default: 1)")
+    args = parser.parse_args(argv)
+
+    reader = StateReader(args.path)
+    try:
+        while True:
+            state = reader.read()
+            counts = [0] * state.room_count
+            o2 = [0.0] * state.room_count
+            for index, room in enumerate(state.rooms):
+                if room >= 0:
+                    counts[room] += 1
+                    o2[room] += state.o2[index]
+            powered = sum(1 for flags in state.flags if flags & POWERED)
+            rooms = ", ".join(f"{o2[room] / counts[room]:.1f}" for room in range(state.room_count) if counts[room])
+            print(f"tick {state.tick}: {state.room_count} rooms, {powered} powered tiles, room O2 [{rooms}]")
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,294 @@
+"""Run a fleet of independent stations in one process.
+
+Every station file becomes a world: a headless simulator with its own map
+size, read from the file, and its own constant overrides. One scheduler
+ticks them all together. A fleet shares one interpreter and one copy of
+every module, instead of paying for a process and a startup per station:
+
+    python fleet.py stations/*.json --set GAS_SPREAD_RATE=0.05,0.1
+
+opens a window on the first world (one world per station and override
+combination, like batch.py). Page Up / Page Down or [ and ] switch between
+worlds, 1-9, 0 and Delete pick a tool, left drag builds, Tab toggles the
+inspect overlay, Ctrl+Z / Ctrl+Y undo and redo, the wheel zooms and middle
+drag or the arrow keys pan. With --ticks the fleet runs headless for that
+many ticks and writes one JSON summary per world instead.
+
+Constants are module-level, so a world's overrides are switched in around
+everything done to it, the same way batch.py applies them to a run. Each
+world also gets the TILE_SIZE that fits its map in the view, since tile
+rectangles, the camera and particles are all laid out from it. Worlds
+with the same map size and overrides are ticked back to back under a
+single switch, and since they all start together their gas updates fall on
+the same ticks.
+
+The switch rewrites globals shared by the whole process and is not
+thread-safe: worlds must only ever be run one at a time, from one thread.
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame
+import constants
+from constants import (
+    GRID_SIZE, HEIGHT, DARK_BG, UI_ACCENT, SIM_TICK_RATE, CAMERA_ZOOM_STEP, CAMERA_PAN_SPEED
+)
+from batch import apply_overrides, parse_override
+from enums import Mode, Tool
+from camera import Camera
+from fonts import get_font
+from shapes import line_cells
+from simulator import Simulator
+from station import load_station_dict
+from tile import draw_tiles
+from viewer import TOOL_KEYS
+
+
+class World:
+    """One station: a headless simulator and the constants it runs under"""
+    def __init__(self, name, data=None, overrides=None):
+        self.name = name
+        self.overrides = dict(overrides or {})
+        if data is not None:
+            # The station decides the map size unless an override does
+            self.overrides.setdefault("ROWS", data["rows"])
+            self.overrides.setdefault("COLS", data["cols"])
+        self.rows = self.overrides.get("ROWS", constants.ROWS)
+        self.cols = self.overrides.get("COLS", constants.COLS)
+        # Derived like constants.TILE_SIZE, so the whole map fits the view when zoomed out
+        self.overrides.setdefault("TILE_SIZE", max(GRID_SIZE // max(self.rows, self.cols), 1))
+        with self.active():
+            self.simulator = Simulator(headless=True)
+            if data is not None:
+                load_station_dict(self.simulator, data)
+            self.camera = Camera()
+
+    @property
+    def key(self):
+        """Worlds with the same key run under the same constants"""
+        return json.dumps(self.overrides, sort_keys=True)
+
+    @contextmanager
+    def active(self):
+        """Switch the world's constants in for the duration of the block"""
+        previous = apply_overrides(self.overrides)
+        try:
+            yield self
+        finally:
+            apply_overrides(previous)
+
+    def summary(self):
+        simulator = self.simulator
+        with self.active():
+            rooms = [
+                {"tiles": len(room.tiles), "breathability": room.get_breathability(),
+                 "pressure": room.pressure()}
+                for room in simulator.rooms
+            ]
+        return {
+            "world": self.name,
+            "rows": self.rows,
+            "cols": self.cols,
+            "overrides": self.overrides,
+            "tick": simulator.update_counter,
+            "rooms": rooms,
+        }
+
+
+class FleetScheduler:
+    """Steps every world one tick at a time, switching constants once per group of alike worlds.
+
+    Worlds run strictly one after another: their constants are swapped in
+    as process-wide globals, so two worlds must never run concurrently.
+    """
+    def __init__(self, worlds):
+        self.worlds = list(worlds)
+        groups = {}
+        for world in self.worlds:
+            groups.setdefault(world.key, []).append(world)
+        self.groups = list(groups.values())
+        self.ticks = 0
+
+    def step(self):
+        for group in self.groups:
+            with group[0].active():
+                for world in group:
+                    world.simulator.tick()
+        self.ticks += 1
+
+    def run(self, ticks):
+        for _ in range(ticks):
+            self.step()
+
+
+class FleetView:
+    """A window on one world of the fleet at a time, which steps the fleet as it draws"""
+    def __init__(self, scheduler):
+        pygame.init()
+        self.win = pygame.display.set_mode((GRID_SIZE, HEIGHT))
+        self.clock = pygame.time.Clock()
+        self.scheduler = scheduler
+        self.index = 0
+        self.mode = Mode.CREATE
+        self.tool = Tool.WALL
+        self.drag_from = None
+        self.panning = False
+        self.show(0)
+
+    @property
+    def world(self):
+        return self.scheduler.worlds[self.index]
+
+    def show(self, index):
+        self.index = index % len(self.scheduler.worlds)
+        self.drag_from = None
+        pygame.display.set_caption(f"Pressurex fleet - {self.world.name}")
+
+    def edit(self, pos):
+        world = self.world
+        row, col = world.camera.screen_to_tile(pos)
+        if not (0 <= row < world.rows and 0 <= col < world.cols) or (row, col) == self.drag_from:
+            return
+        start = self.drag_from or (row, col)
+        self.drag_from = (row, col)
+        with world.active():
+            world.simulator.apply_tools(line_cells(start, (row, col)), self.tool)
+
+    def handle(self, event):
+        camera = self.world.camera
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            if event.button in (4, 5):
+                with self.world.active():
+                    camera.zoom_at(CAMERA_ZOOM_STEP if event.button == 4 else 1 / CAMERA_ZOOM_STEP, event.pos)
+            elif event.button == 2:
+                self.panning = True
+            elif event.button == 1:
+                self.drag_from = None
+                self.edit(event.pos)
+        elif event.type == pygame.MOUSEMOTION:
+            if self.panning:
+                with self.world.active():
+                    camera.pan(-event.rel[0], -event.rel[1])
+            elif event.buttons[0] and self.drag_from:
+                self.edit(event.pos)
+        elif event.type == pygame.MOUSEBUTTONUP:
+            if event.button == 2:
+                self.panning = False
+            elif event.button == 1:
+                self.drag_from = None
+        elif event.type == pygame.KEYDOWN:
+            if event.key in (pygame.K_PAGEUP, pygame.K_LEFTBRACKET):
+                self.show(self.index - 1)
+            elif event.key in (pygame.K_PAGEDOWN, pygame.K_RIGHTBRACKET):
+                self.show(self.index + 1)
+            elif event.key in TOOL_KEYS:
+                self.tool = TOOL_KEYS[event.key]
+            elif event.key == pygame.K_TAB:
+                self.mode = Mode.INSPECT if self.mode == Mode.CREATE else Mode.CREATE
+            elif event.key in (pygame.K_z, pygame.K_y) and event.mod & pygame.KMOD_CTRL:
+                history = self.world.simulator.history
+                with self.world.active():
+                    if event.key == pygame.K_y or event.mod & pygame.KMOD_SHIFT:
+                        history.redo()
+                    else:
+                        history.undo()
+
+    def draw(self):
+        world = self.world
+        self.win.fill(DARK_BG)
+        with world.active():
+            simulator, camera = world.simulator, world.camera
+            simulator.links.refresh()
+            row0, col0, row1, col1 = camera.visible_tiles()
+            draw_tiles(self.win, [(camera.tile_rect(row, col), simulator.grid[row][col].render_state())
+                                  for row in range(row0, row1 + 1) for col in range(col0, col1 + 1)], self.mode)
+
+        font = get_font('./fonts/font.ttf', 20)
+        label = (f"{world.name} ({self.index + 1}/{len(self.scheduler.worlds)})  |  {self.tool.value}  |  "
+                 f"tick {world.simulator.update_counter}  |  {self.clock.get_fps():.0f} fps")
+        self.win.blit(font.render(label, False, UI_ACCENT), (8, 8))
+        pygame.display.flip()
+
+    def run(self):
+        running = True
+        while running:
+            self.clock.tick(SIM_TICK_RATE)
+            keys = pygame.key.get_pressed()
+            pan_x = keys[pygame.K_RIGHT] - keys[pygame.K_LEFT]
+            pan_y = keys[pygame.K_DOWN] - keys[pygame.K_UP]
+            if pan_x or pan_y:
+                with self.world.active():
+                    self.world.camera.pan(pan_x * CAMERA_PAN_SPEED, pan_y * CAMERA_PAN_SPEED)
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
+                else:
+                    self.handle(event)
+            self.scheduler.step()
+            self.draw()
+        pygame.quit()
+
+
+def build_worlds(stations, override_axes):
+    """One world per station and combination of override values"""
+    names = [name for name, _ in override_axes]
+    combos = list(itertools.product(*[values for _, values in override_axes]))
+    worlds = []
+    for station_path in stations:
+        with open(station_path) as f:
+            data = json.load(f)
+        for combo in combos:
+            overrides = dict(zip(names, combo))
+            label = " ".join(f"{name}={value}" for name, value in overrides.items())
+            name = os.path.basename(station_path) + (f" [{label}]" if label else "")
+            worlds.append(World(name, data, overrides))
+    return worlds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate many stations in one process.")
+    parser.add_argument("stations", nargs="+", help="station JSON files (save with Ctrl+S in game)")
+    parser.add_argument("--set", dest="overrides", type=parse_override, action="append", default=[],
+                        metavar="NAME=V1,V2", help="override a constant; several values make one world each")
+    parser.add_argument("--ticks", type=int, default=None,
+                        help="run headless for this many ticks and print a summary per world")
+    parser.add_argument("-o", "--output", default=None, help="JSON lines file for the summaries (default: stdout)")
+    args = parser.parse_args(argv)
+
+    for name, _ in args.overrides:
+        if not name.isupper() or not hasattr(constants, name):
+            parser.error(f"unknown constant: {name}")
+
+    start = time.perf_counter()
+    scheduler = FleetScheduler(build_worlds(args.stations, args.overrides))
+    print(f"{len(scheduler.worlds)} worlds in {len(scheduler.groups)} groups, "
+          f"loaded in {time.perf_counter() - start:.2f} s", file=sys.stderr)
+
+    if args.ticks is None:
+        FleetView(scheduler).run()
+        return 0
+
+    start = time.perf_counter()
+    scheduler.run(args.ticks)
+    elapsed = time.perf_counter() - start
+    print(f"{args.ticks} ticks in {elapsed:.2f} s, {elapsed / args.ticks * 1000:.2f} ms per fleet tick",
+          file=sys.stderr)
+    out = open(args.output, "w") if args.output else sys.stdout
+    try:
+        for world in scheduler.worlds:
+            out.write(json.dumps(world.summary()) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
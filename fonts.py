@@ -0,0 +1,23 @@
+import pygame
+
+# Loaded fonts by (path, size). SysFont scans every installed font the first
+# time it is called, so each font is created once, on first use, and shared.
+loaded_fonts = {}
+
+
+def get_font(path, size):
+    """The font at path (or the system Arial when path is None), loaded on first use"""
+    key = (path, size)
+    font = loaded_fonts.get(key)
+    if font is None:
+        if not pygame.font.get_init():
+            pygame.font.init()
+        if path is not None:
+            try:
+                font = pygame.font.Font(path, size)
+            except (FileNotFoundError, RuntimeError) as e:
+                print(f"Could not load font {path}: {e}")
+        if font is None:
+            font = pygame.font.SysFont('arial', size)
+        loaded_fonts[key] = font
+    return font
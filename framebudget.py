@@ -0,0 +1,90 @@
+import time
+from constants import (
+    FRAME_BUDGET_MS, FRAME_BUDGET_DEGRADE_FRAMES, FRAME_BUDGET_RECOVER_FRAMES, FRAME_BUDGET_RECOVER_RATIO
+)
+
+# Optional work shed under load, first to last, with how it is reported to the player
+DEGRADATIONS = (
+    ("fewer_particles", "fewer vent particles"),
+    ("no_animations", "UI animations off"),
+    ("slow_map_refresh", "map redrawn every other frame"),
+    ("no_particles", "vent particles off"),
+)
+
+
+class FrameBudget:
+    """Measures each frame's work and sheds optional visual work while it runs over budget.
+
+    The work is everything between the frame cap wait and the display flip.
+    Its running average is compared with the budget: after
+    FRAME_BUDGET_DEGRADE_FRAMES frames over it the next degradation in
+    DEGRADATIONS is switched on, and after FRAME_BUDGET_RECOVER_FRAMES frames
+    comfortably under it (below FRAME_BUDGET_RECOVER_RATIO of the budget) the
+    last one is switched off again. Nothing here touches the simulation: the
+    tick still runs every frame, only particles, animations and redraws
+    change.
+    """
+    def __init__(self, budget_ms=FRAME_BUDGET_MS):
+        self.budget = budget_ms / 1000
+        self.level = 0  # How many of DEGRADATIONS are active
+        self.average = 0.0
+        self.over = 0
+        self.under = 0
+        self.start = None
+
+    def active(self):
+        """Names of the degradations in effect"""
+        return [name for name, _ in DEGRADATIONS[:self.level]]
+
+    def describe(self):
+        return ", ".join(description for _, description in DEGRADATIONS[:self.level])
+
+    @property
+    def particle_scale(self):
+        """Fraction of the usual vent particles to emit"""
+        if self.level >= 4:
+            return 0.0
+        return 0.5 if self.level >= 1 else 1.0
+
+    @property
+    def animations(self):
+        return self.level < 2
+
+    @property
+    def map_refresh_interval(self):
+        """Frames between redraws of the tiles while the view stays still"""
+        return 2 if self.level >= 3 else 1
+
+    @property
+    def draw_particles(self):
+        return self.level < 4
+
+    def begin_frame(self):
+        self.start = time.perf_counter()
+
+    def end_frame(self):
+        """Account for the frame's work, returning True if the level changed"""
+        if self.start is None:
+            return False
+        elapsed = time.perf_counter() - self.start
+        self.start = None
+        # Smooth over a few frames so a single hitch does not shed anything
+        self.average += (elapsed - self.average) * 0.1
+
+        if self.average > self.budget:
+            self.under = 0
+            self.over += 1
+            if self.over >= FRAME_BUDGET_DEGRADE_FRAMES and self.level < len(DEGRADATIONS):
+                self.level += 1
+                self.over = 0
+                return True
+        elif self.average < self.budget * FRAME_BUDGET_RECOVER_RATIO:
+            self.over = 0
+            self.under += 1
+            if self.under >= FRAME_BUDGET_RECOVER_FRAMES and self.level > 0:
+                self.level -= 1
+                self.under = 0
+                return True
+        else:
+            self.over = self.under = 0
+        return False
@@ -0,0 +1,127 @@
+from constants import ROWS, COLS, GAS_LOD_BLOCK_SIZE, GAS_LOD_TOLERANCE, GAS_LOD_RECHECK_INTERVAL
+
+
+class GasBlock:
+    """A square of open tiles that can be simulated as a single coarse cell"""
+    def __init__(self, tiles, halo, vacuum):
+        self.tiles = tiles
+        self.halo = halo  # Open tiles just outside the block that exchange gas with it
+        self.vacuum = vacuum
+        self.coarse = False
+        self.next_check = 0
+
+    def value(self):
+        gases = self.tiles[0].gases
+        return gases.o2, gases.co2, gases.n2
+
+
+class GasLOD:
+    """Multi-resolution bookkeeping for update_gases.
+
+    The grid is split into GAS_LOD_BLOCK_SIZE squares. Blocks free of walls,
+    doors, pipes and components that lie entirely in vacuum or in one room
+    collapse into a coarse cell once they and their halo are uniform within
+    GAS_LOD_TOLERANCE. Coarse blocks skip per-tile diffusion (a uniform region
+    does not change under it) and vacuum blocks dissipate as one value. A block
+    refines again as soon as its halo drifts away from it, and every block
+    refines when the topology changes.
+    """
+    def __init__(self, simulator):
+        self.simulator = simulator
+        self.blocks = []
+        self.static_fine = []  # Tiles in blocks that can never go coarse
+        self.fine_tiles = []
+        self.topology_version = None
+        self.updates = 0
+
+    def rebuild(self):
+        grid = self.simulator.grid
+        size = GAS_LOD_BLOCK_SIZE
+        self.blocks = []
+        self.static_fine = []
+
+        for row0 in range(0, ROWS, size):
+            for col0 in range(0, COLS, size):
+                rows = range(row0, min(row0 + size, ROWS))
+                cols = range(col0, min(col0 + size, COLS))
+                tiles = [grid[row][col] for row in rows for col in cols]
+
+                room = tiles[0].room
+                eligible = all(
+                    not (tile.wall or tile.door or tile.pipe or tile.component) and tile.room is room
+                    for tile in tiles
+                )
+                if not eligible:
+                    self.static_fine.extend(tiles)
+                    continue
+
+                halo = []
+                for tile in tiles:
+                    for dr, dc in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
+                        nr, nc = tile.row + dr, tile.col + dc
+                        if 0 <= nr < ROWS and 0 <= nc < COLS and not (nr in rows and nc in cols):
+                            neighbor = grid[nr][nc]
+                            if not neighbor.wall and not neighbor.door and not neighbor.pipe:
+                                halo.append(neighbor)
+                self.blocks.append(GasBlock(tiles, halo, room is None))
+
+        self.topology_version = self.simulator.topology_version
+
+    def is_uniform(self, block, tiles):
+        o2, co2, n2 = block.value()
+        tol = GAS_LOD_TOLERANCE
+        for tile in tiles:
+            gases = tile.gases
+            if (abs(gases.o2 - o2) > tol or abs(gases.co2 - co2) > tol or
+                    abs(gases.n2 - n2) > tol):
+                return False
+        return True
+
+    def update(self, dissipation_rate):
+        """Refine or coarsen blocks, dissipate coarse vacuum and list the fine tiles"""
+        if self.topology_version != self.simulator.topology_version:
+            self.rebuild()
+        self.updates += 1
+
+        fine_tiles = list(self.static_fine)
+        for block in self.blocks:
+            if block.coarse:
+                if not self.is_uniform(block, block.halo):
+                    block.coarse = False
+                    block.next_check = self.updates + GAS_LOD_RECHECK_INTERVAL
+            elif self.updates >= block.next_check:
+                if self.is_uniform(block, block.tiles) and self.is_uniform(block, block.halo):
+                    block.coarse = True
+                else:
+                    block.next_check = self.updates + GAS_LOD_RECHECK_INTERVAL
+
+            if not block.coarse:
+                fine_tiles.extend(block.tiles)
+            elif block.vacuum:
+                self.dissipate(block, dissipation_rate)
+
+        self.fine_tiles = fine_tiles
+        return fine_tiles
+
+    def dissipate(self, block, rate):
+        o2, co2, n2 = block.value()
+        if not (o2 or co2 or n2):
+            return  # Settled vacuum, nothing to write
+
+        o2 *= (1 - rate)
+        co2 *= (1 - rate)
+        n2 *= (1 - rate)
+        # Clean up very small values
+        if o2 < 0.01: o2 = 0
+        if co2 < 0.01: co2 = 0
+        if n2 < 0.01: n2 = 0
+        for tile in block.tiles:
+            tile.gases.o2 = o2
+            tile.gases.co2 = co2
+            tile.gases.n2 = n2
+        self.simulator.changes.gases_updated(block.tiles)
+
+    def coarse_fraction(self):
+        total = ROWS * COLS
+        coarse = sum(len(block.tiles) for block in self.blocks if block.coarse)
+        return coarse / total if total else 0.0
@@ -0,0 +1,104 @@
+from constants import ROWS, COLS, CHUNK_SIZE
+
+
+class Edit:
+    """The state of every chunk an edit touched, as it was before the edit"""
+    def __init__(self, rooms):
+        self.rooms = rooms
+        self.chunks = {}
+
+
+class EditHistory:
+    """Unlimited undo/redo of station edits using copy-on-write chunk snapshots.
+
+    An edit copies a CHUNK_SIZE chunk of tile state the first time it touches
+    a tile in it, so the cost of recording follows the size of the edit, not
+    the station. Components and rooms are kept by reference, not copied.
+    """
+    def __init__(self, simulator):
+        self.simulator = simulator
+        self.undo_stack = []
+        self.redo_stack = []
+        self.current = None
+
+    def begin(self):
+        """Start recording an edit, returning False if one is already open"""
+        if self.current is not None:
+            return False
+        self.current = Edit(list(self.simulator.rooms))
+        return True
+
+    def touch(self, row, col):
+        """Call before changing a tile so its chunk can be restored"""
+        self.simulator.mark_changed(row, col)
+        if self.current is None:
+            return
+        key = (row // CHUNK_SIZE, col // CHUNK_SIZE)
+        if key not in self.current.chunks:
+            self.current.chunks[key] = self.capture(key)
+
+    def commit(self):
+        edit, self.current = self.current, None
+        if edit is not None and edit.chunks:
+            self.undo_stack.append(edit)
+            self.redo_stack.clear()
+
+    def undo(self):
+        return self.swap(self.undo_stack, self.redo_stack)
+
+    def redo(self):
+        return self.swap(self.redo_stack, self.undo_stack)
+
+    def swap(self, source, target):
+        """Restore the newest edit from source and record the state it replaced on target.
+
+        A batch still open is closed first, so its edit is committed and
+        can itself be undone, rather than mixed with the restored state.
+        """
+        self.simulator.close_batches()
+        self.commit()
+        if not source:
+            return False
+        edit = source.pop()
+        simulator = self.simulator
+        reverse = Edit(list(simulator.rooms))
+        for key, snapshot in edit.chunks.items():
+            reverse.chunks[key] = self.capture(key)
+            simulator.changed_chunks.add(key)
+            self.restore(key, snapshot)
+        target.append(reverse)
+
+        simulator.rooms = edit.rooms
+        for room in simulator.rooms:
+            simulator.changes.room_updated(room, force=True)
+        simulator.topology_version += 1
+        simulator.assign_pipe_networks()
+        simulator.refresh_power_labels()
+        return True
+
+    def chunk_tiles(self, key):
+        grid = self.simulator.grid
+        row0, col0 = key[0] * CHUNK_SIZE, key[1] * CHUNK_SIZE
+        for row in range(row0, min(row0 + CHUNK_SIZE, ROWS)):
+            for col in range(col0, min(col0 + CHUNK_SIZE, COLS)):
+                yield grid[row][col]
+
+    def capture(self, key):
+        return tuple(
+            (tile.wall, tile.door, tile.wire, tile.pipe, tile.damage, tile.component, tile.room)
+            for tile in self.chunk_tiles(key)
+        )
+
+    def restore(self, key, snapshot):
+        for tile, state in zip(self.chunk_tiles(key), snapshot):
+            if state != (tile.wall, tile.door, tile.wire, tile.pipe, tile.damage, tile.component, tile.room):
+                self.simulator.mark_changed(tile.row, tile.col)
+            tile.wall, tile.door, tile.wire, tile.pipe, tile.damage, component, room = state
+            if tile.component is not component:
+                self.simulator.set_component(tile, component)
+            if tile.room is not room:
+                if tile.room:
+                    tile.room.tiles.discard(tile)
+                if room:
+                    room.tiles.add(tile)
+                tile.room = room
@@ -1,6 +1,10 @@
-
+import sys
 from simulator import Simulator
 
 if __name__ == "__main__":
     simulator = Simulator()
+    if len(sys.argv) > 1:
+        # Resume a saved station, e.g. `main.py autosave.json` after a crash
+        from station import load_station
+        load_station(simulator, sys.argv[1])
     simulator.run()
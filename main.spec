@@ -29,6 +29,7 @@ a = Analysis(
         'http',
         'xml',
         'pydoc',
+        'pkg_resources',  # pygame falls back without it; importing it costs ~90 ms at startup
     ],
     cipher=block_cipher,
     noarchive=False,
@@ -0,0 +1,170 @@
+"""Prometheus-style metrics for a running station.
+
+Turn on with METRICS_ENABLED (or server.py --metrics-port / --metrics-file).
+The simulator times each subsystem of every tick and the game loop times
+every frame, which only adds to a few counters. Everything else (rooms,
+networks, gas mass and so on) is sampled once every METRICS_INTERVAL ticks
+on the simulation thread, when the exposition text is rebuilt. That text is
+then written to METRICS_FILE for a textfile collector and served at
+http://METRICS_HOST:METRICS_PORT/metrics.
+"""
+import os
+import socketserver
+import tempfile
+import threading
+import time
+from constants import METRICS_INTERVAL, METRICS_FILE, METRICS_HOST, METRICS_PORT
+
+PREFIX = "pressurex"
+
+# Subsystems timed by Simulator.tick, in the order they run
+SUBSYSTEMS = ("power", "pipe_networks", "components", "gases", "pipe_flow", "particles")
+
+
+class Metrics:
+    """Counters fed by the simulation, and the text exposition built from them"""
+    def __init__(self, simulator, interval=METRICS_INTERVAL, path=METRICS_FILE,
+                 host=METRICS_HOST, port=METRICS_PORT):
+        self.simulator = simulator
+        self.interval = interval
+        self.path = path
+        self.subsystem_seconds = dict.fromkeys(SUBSYSTEMS, 0.0)
+        self.subsystem_runs = dict.fromkeys(SUBSYSTEMS, 0)
+        self.tick_seconds = 0.0
+        self.ticks = 0
+        self.frame_seconds = 0.0
+        self.frames = 0
+        self.last_frame = 0.0
+        self.sample_time = time.perf_counter()
+        self.sample_ticks = 0
+        self.ticks_per_second = 0.0
+        self.text = ""
+
+        self.server = None
+        if port is not None:
+            self.server = MetricsServer((host, port), self)
+            threading.Thread(target=self.server.serve_forever, name="metrics", daemon=True).start()
+        self.sample()
+
+    def record(self, subsystem, start):
+        """Add the time since start to a subsystem, returning now for the next one"""
+        now = time.perf_counter()
+        self.subsystem_seconds[subsystem] += now - start
+        self.subsystem_runs[subsystem] += 1
+        return now
+
+    def tick_done(self, start):
+        self.tick_seconds += time.perf_counter() - start
+        self.ticks += 1
+        if self.ticks % self.interval == 0:
+            self.sample()
+
+    def frame_done(self, seconds):
+        self.frame_seconds += seconds
+        self.frames += 1
+        self.last_frame = seconds
+
+    def sample(self):
+        """Read the simulation's gauges and rebuild the exposition text"""
+        from components import Engine, OxygenGenerator, InputVent, OutputVent, Plant, Spac12
+        simulator = self.simulator
+        now = time.perf_counter()
+        if now > self.sample_time:
+            self.ticks_per_second = (self.ticks - self.sample_ticks) / (now - self.sample_time)
+        self.sample_time = now
+        self.sample_ticks = self.ticks
+
+        o2 = co2 = n2 = 0.0
+        for grid_row in simulator.grid:
+            for tile in grid_row:
+                gases = tile.gases
+                o2 += gases.o2
+                co2 += gases.co2
+                n2 += gases.n2
+        for network in simulator.pipe_networks:
+            o2 += network.gases.o2
+            co2 += network.gases.co2
+            n2 += network.gases.n2
+
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+            for suffix, labels, value in samples:
+                lines.append(f"{PREFIX}_{name}{suffix}{labels} {value}")
+
+        subsystems = [(f'{{subsystem="{name}"}}', name) for name in SUBSYSTEMS]
+        metric("subsystem_seconds", "summary", "Time spent in each simulation subsystem.",
+               [("_sum", labels, self.subsystem_seconds[name]) for labels, name in subsystems] +
+               [("_count", labels, self.subsystem_runs[name]) for labels, name in subsystems])
+        metric("tick_seconds", "summary", "Time per simulation tick, its count being the ticks run.",
+               [("_sum", "", self.tick_seconds), ("_count", "", self.ticks)])
+        metric("ticks_per_second", "gauge", "Ticks per second over the last sample interval.",
+               [("", "", round(self.ticks_per_second, 3))])
+        metric("frame_seconds", "summary", "Time per drawn frame, including the frame cap wait.",
+               [("_sum", "", self.frame_seconds), ("_count", "", self.frames)])
+        metric("last_frame_seconds", "gauge", "Duration of the most recent frame.", [("", "", self.last_frame)])
+        metric("rooms", "gauge", "Enclosed rooms.", [("", "", len(simulator.rooms))])
+        metric("pipe_networks", "gauge", "Connected pipe networks.", [("", "", len(simulator.pipe_networks))])
+        metric("powered_tiles", "gauge", "Tiles receiving power.", [("", "", len(simulator.powered_tiles))])
+        metric("particles", "gauge", "Live vent particles.", [("", "", len(simulator.particles))])
+        metric("components", "gauge", "Placed components by type.",
+               [("", f'{{type="{component_type.__name__}"}}', simulator.components.count(component_type))
+                for component_type in (Engine, OxygenGenerator, InputVent, OutputVent, Plant, Spac12)])
+        metric("gas_mass", "gauge", "Total gas on tiles and in pipes, by species.",
+               [("", '{gas="o2"}', o2), ("", '{gas="co2"}', co2), ("", '{gas="n2"}', n2)])
+        if simulator.frame_budget:
+            from framebudget import DEGRADATIONS
+            active = simulator.frame_budget.active()
+            metric("degradation", "gauge", "Optional visual work shed to hold the frame budget, 1 while active.",
+                   [("", f'{{name="{name}"}}', int(name in active)) for name, _ in DEGRADATIONS])
+        self.text = "\n".join(lines) + "\n"
+
+        if self.path:
+            self.write(self.path)
+
+    def write(self, path):
+        """Replace the metrics file in one step, so a collector never reads half of it"""
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(self.text)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def close(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+class MetricsHandler(socketserver.StreamRequestHandler):
+    """Answers every HTTP request with the latest exposition text.
+
+    Written against socketserver because the frozen build leaves out the
+    http package.
+    """
+    def handle(self):
+        request = self.rfile.readline(65537).decode("latin-1").split()
+        while self.rfile.readline(65537).strip():
+            pass  # Skip the headers
+        if len(request) >= 2 and request[0] in ("GET", "HEAD") and request[1].split("?")[0] in ("/", "/metrics"):
+            status, body = "200 OK", self.server.metrics.text.encode()
+        else:
+            status, body = "404 Not Found", b"Not found\n"
+        head = (f"HTTP/1.0 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n").encode()
+        self.wfile.write(head if request[:1] == ["HEAD"] else head + body)
+
+
+class MetricsServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, metrics):
+        self.metrics = metrics
+        super().__init__(address, MetricsHandler)
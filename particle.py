@@ -1,33 +1,142 @@
 import pygame
 import random
+import math
 
-class Particle:
-    def __init__(self, x, y, vx, vy, lifespan, color, reverse_fade=False):
+# Unit vectors for evenly spaced emission angles, so emitting needs no trig
+DIRECTION_STEPS = 64
+DIRECTIONS = [(math.cos(2 * math.pi * i / DIRECTION_STEPS), math.sin(2 * math.pi * i / DIRECTION_STEPS))
+              for i in range(DIRECTION_STEPS)]
+
+
+class ParticleStore:
+    """All live particles as parallel lists, updated and culled in one pass.
+
+    Particles are written here by emitters; `limit` caps the total so a
+    station full of vents cannot flood the frame.
+    """
+    def __init__(self, limit):
+        self.limit = limit
+        self.x = []
+        self.y = []
+        self.vx = []
+        self.vy = []
+        self.age = []
+        self.lifespan = []
+        self.color = []
+        self.reverse_fade = []
+        self.emitter = []
+        self.emission_scale = 1.0  # Fraction of each emitted batch actually created, lowered under load
+
+    def __len__(self):
+        return len(self.x)
+
+    def free(self):
+        return max(self.limit - len(self.x), 0)
+
+    def update(self):
+        """Move every particle one step and drop the ones that expired"""
+        x, y, vx, vy, age, lifespan = self.x, self.y, self.vx, self.vy, self.age, self.lifespan
+        keep = []
+        for i in range(len(x)):
+            x[i] += vx[i]
+            y[i] += vy[i]
+            age[i] += 1
+            if age[i] < lifespan[i]:
+                keep.append(i)
+            else:
+                self.emitter[i].alive -= 1
+        if len(keep) < len(x):
+            for name in ("x", "y", "vx", "vy", "age", "lifespan", "color", "reverse_fade", "emitter"):
+                values = getattr(self, name)
+                setattr(self, name, [values[i] for i in keep])
+
+    def frame(self):
+        """Positions, colours and alphas of the live particles, for drawing"""
+        alphas = []
+        for age, lifespan, reverse_fade in zip(self.age, self.lifespan, self.reverse_fade):
+            fade = 255 * age // lifespan
+            alphas.append(min(255, fade) if reverse_fade else max(0, 255 - fade))
+        return ParticleFrame(tuple(self.x), tuple(self.y), tuple(self.color), tuple(alphas))
+
+    def draw(self, surface, camera):
+        self.frame().draw(surface, camera)
+
+
+class ParticleFrame:
+    """An immutable copy of the particles at one tick, safe to draw from another thread"""
+    # Pre-drawn dots by (colour, alpha), shared by every frame
+    dot_surfaces = {}
+
+    def __init__(self, x, y, color, alpha):
         self.x = x
         self.y = y
-        self.vx = vx + random.uniform(-0.2, 0.2)
-        self.vy = vy + random.uniform(-0.2, 0.2)
-        self.lifespan = lifespan
         self.color = color
-        self.age = 0
+        self.alpha = alpha
+
+    def dot(self, color, alpha):
+        key = (color, alpha)
+        surface = self.dot_surfaces.get(key)
+        if surface is None:
+            surface = pygame.Surface((4, 4), pygame.SRCALPHA)
+            pygame.draw.circle(surface, (*color, alpha), (2, 2), 2)
+            self.dot_surfaces[key] = surface
+        return surface
+
+    def draw(self, surface, camera):
+        """Draw the particles inside the camera view"""
+        zoom, left, top = camera.zoom, camera.x, camera.y
+        width, height = surface.get_size()
+        blits = []
+        for i in range(len(self.x)):
+            x = (self.x[i] - left) * zoom
+            y = (self.y[i] - top) * zoom
+            if not (-4 < x < width and -4 < y < height):
+                continue
+            blits.append((self.dot(self.color[i], self.alpha[i]), (x, y)))
+        surface.blits(blits, doreturn=False)
+
+
+class ParticleEmitter:
+    """Writes batches of particles into a store from its own seeded RNG.
+
+    Every emitter has a fixed style (inward or outward, start offset, fade)
+    and a budget on how many of its particles may be alive at once. With
+    the same seed an emitter always produces the same particles.
+    """
+    def __init__(self, store, seed, budget, inward=False, offset=0, reverse_fade=False):
+        self.store = store
+        self.random = random.Random(seed)
+        self.budget = budget
+        self.inward = inward
+        self.offset = offset
         self.reverse_fade = reverse_fade
+        self.alive = 0
 
-    def update(self):
-        self.x += self.vx
-        self.y += self.vy
-        self.age += 1
-
-    def draw(self, surface):
-        if self.is_alive():
-            # Calculate alpha based on age and whether to reverse the fade
-            if self.reverse_fade:
-                alpha = min(255, int(255 * (self.age / self.lifespan)))
-            else:
-                alpha = max(0, 255 - int(255 * (self.age / self.lifespan)))
-                
-            particle_surface = pygame.Surface((4, 4), pygame.SRCALPHA)
-            pygame.draw.circle(particle_surface, (*self.color, alpha), (2, 2), 2)
-            surface.blit(particle_surface, (self.x, self.y))
-
-    def is_alive(self):
-        return self.age < self.lifespan
+    def emit(self, batches):
+        """Emit (x, y, color, count, (min_speed, max_speed), lifespan) batches, within budget"""
+        store = self.store
+        rng = self.random
+        sign = -1 if self.inward else 1
+        for x, y, color, count, (min_speed, max_speed), lifespan in batches:
+            if store.emission_scale < 1:
+                # Round randomly so small batches still emit at the scaled rate on average
+                count = int(count * store.emission_scale + rng.random())
+            count = min(count, self.budget - self.alive, store.free())
+            if count <= 0:
+                continue
+            for _ in range(count):
+                dx, dy = DIRECTIONS[rng.randrange(DIRECTION_STEPS)]
+                speed = rng.uniform(min_speed, max_speed) * sign
+                vx = dx * speed
+                vy = dy * speed
+                store.x.append(x + vx * self.offset)
+                store.y.append(y + vy * self.offset)
+                # Small jitter so particles on the same direction spread out
+                store.vx.append(vx + rng.uniform(-0.2, 0.2))
+                store.vy.append(vy + rng.uniform(-0.2, 0.2))
+                store.age.append(0)
+                store.lifespan.append(lifespan)
+                store.color.append(color)
+                store.reverse_fade.append(self.reverse_fade)
+                store.emitter.append(self)
+            self.alive += count
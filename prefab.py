@@ -0,0 +1,127 @@
+import json
+from constants import ROWS, COLS
+from components import Spac12
+from station import COMPONENT_TYPES
+
+PREFAB_FORMAT_VERSION = 1
+
+# Tile flags packed into one int per cell
+WALL = 1
+DOOR = 2
+WIRE = 4
+PIPE = 8
+
+
+class Prefab:
+    """A captured rectangle of station layout that can be stamped anywhere.
+
+    Only non-empty cells are stored, as (row, col, flags, component name)
+    relative to the top-left corner. Stamping overwrites the whole footprint,
+    so empty cells in the template clear whatever was there.
+    """
+    def __init__(self, rows, cols, cells):
+        self.rows = rows
+        self.cols = cols
+        self.cells = tuple(cells)
+        self.compiled = {}  # Rotated cell lists with component classes, by quarter turns
+
+    @classmethod
+    def capture(cls, simulator, start, end):
+        row0, row1 = sorted((start[0], end[0]))
+        col0, col1 = sorted((start[1], end[1]))
+        cells = []
+        for row in range(row0, row1 + 1):
+            for col in range(col0, col1 + 1):
+                tile = simulator.grid[row][col]
+                flags = ((WALL if tile.wall else 0) | (DOOR if tile.door else 0) |
+                         (WIRE if tile.wire else 0) | (PIPE if tile.pipe else 0))
+                component = type(tile.component).__name__ if tile.component else None
+                if flags or component:
+                    cells.append((row - row0, col - col0, flags, component))
+        return cls(row1 - row0 + 1, col1 - col0 + 1, cells)
+
+    def size(self, turns=0):
+        return (self.cols, self.rows) if turns % 2 else (self.rows, self.cols)
+
+    def compile(self, turns):
+        """Cells rotated clockwise by the given quarter turns, with component classes resolved"""
+        turns %= 4
+        if turns not in self.compiled:
+            cells = []
+            for row, col, flags, component in self.cells:
+                rows, cols = self.rows, self.cols
+                for _ in range(turns):
+                    row, col = col, rows - 1 - row
+                    rows, cols = cols, rows
+                cells.append((row, col, flags, COMPONENT_TYPES[component] if component else None))
+            self.compiled[turns] = cells
+        return self.compiled[turns]
+
+    def stamp(self, simulator, top, left, turns=0):
+        """Write the prefab with its top-left corner at (top, left) as one batched edit"""
+        height, width = self.size(turns)
+        simulator.begin_batch()
+        try:
+            # Clear the footprint, then write every cell's structure in one pass
+            for row in range(max(top, 0), min(top + height, ROWS)):
+                for col in range(max(left, 0), min(left + width, COLS)):
+                    tile = simulator.grid[row][col]
+                    simulator.history.touch(row, col)
+                    tile.wall = tile.door = tile.wire = tile.pipe = False
+                    tile.damage = 0
+                    simulator.set_component(tile, None)
+
+            components = []
+            for row, col, flags, component_type in self.compile(turns):
+                row, col = top + row, left + col
+                if not (0 <= row < ROWS and 0 <= col < COLS):
+                    continue
+                tile = simulator.grid[row][col]
+                tile.wall = bool(flags & WALL)
+                tile.door = bool(flags & DOOR)
+                tile.wire = bool(flags & WIRE)
+                tile.pipe = bool(flags & PIPE)
+                if component_type:
+                    components.append((tile, component_type))
+            simulator.topology_version += 1
+
+            # Components go in once the walls that enclose their rooms exist
+            placed = 0
+            for tile, component_type in components:
+                if component_type is Spac12:
+                    room = None
+                    if tile.room:
+                        continue  # SPAC-12 only works in vacuum
+                else:
+                    room = tile.room or simulator.create_room(simulator.flood_fill(tile))
+                    if not room:
+                        continue  # Not enclosed at this position
+                simulator.set_component(tile, component_type(room))
+                placed += 1
+        finally:
+            simulator.end_batch()
+        return placed, len(components)
+
+    def to_dict(self):
+        return {
+            "version": PREFAB_FORMAT_VERSION,
+            "rows": self.rows,
+            "cols": self.cols,
+            "cells": [list(cell) for cell in self.cells],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get("version") != PREFAB_FORMAT_VERSION:
+            raise ValueError(f"Unsupported prefab format version: {data.get('version')}")
+        return cls(data["rows"], data["cols"], [tuple(cell) for cell in data["cells"]])
+
+
+def save_prefab(prefab, path):
+    with open(path, "w") as f:
+        json.dump(prefab.to_dict(), f)
+
+
+def load_prefab(path):
+    with open(path) as f:
+        return Prefab.from_dict(json.load(f))
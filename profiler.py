@@ -0,0 +1,77 @@
+import cProfile
+import json
+import os
+import pstats
+import time
+from constants import PROFILE_FRAME_BUDGET_MS, PROFILE_DIR, PROFILE_MAX_DUMPS
+
+# Simulator methods whose cumulative time is reported for each slow frame
+SUBSYSTEM_FUNCTIONS = {
+    "update_power_network": "power",
+    "assign_pipe_networks": "pipe_networks",
+    "update_components": "components",
+    "update_gases": "gases",
+    "update_pipe_flow": "pipe_flow",
+    "update_particles": "particles",
+    "tick": "tick",
+    "draw": "draw",
+}
+
+
+class SlowFrameProfiler:
+    """Profiles every frame with cProfile but keeps only the frames over budget.
+
+    The frame's work (tick and draw, not the frame cap wait) runs under the
+    profiler. When it took longer than budget_ms the profile is dumped to
+    frame-<tick>.pstats in the directory, and a line with the tick, the
+    frame time and the time spent in each subsystem goes to
+    slow_frames.jsonl next to it. Other frames' data is thrown away, so a
+    long session leaves behind only its hitches. Times include the
+    profiler's own overhead, which is why only over-budget frames are kept
+    rather than compared with each other. With the simulation worker thread
+    on, only the main thread (input and drawing) is profiled.
+    """
+    def __init__(self, budget_ms=PROFILE_FRAME_BUDGET_MS, directory=PROFILE_DIR, max_dumps=PROFILE_MAX_DUMPS):
+        self.budget = budget_ms / 1000
+        self.directory = directory
+        self.max_dumps = max_dumps
+        self.dumps = 0
+        self.profile = cProfile.Profile()
+        self.start = None
+        os.makedirs(directory, exist_ok=True)
+
+    def begin_frame(self):
+        if self.dumps >= self.max_dumps:
+            return
+        self.start = time.perf_counter()
+        self.profile.enable()
+
+    def end_frame(self, tick):
+        """Stop profiling the frame, dumping it if it ran over budget; returns the dump path or None"""
+        if self.start is None:
+            return None
+        self.profile.disable()
+        elapsed = time.perf_counter() - self.start
+        self.start = None
+        if elapsed <= self.budget:
+            self.profile.clear()
+            return None
+
+        path = os.path.join(self.directory, f"frame-{tick:08d}.pstats")
+        stats = pstats.Stats(self.profile)
+        stats.dump_stats(path)
+        subsystems = {}
+        for (filename, line, function), (_, _, _, cumulative, _) in stats.stats.items():
+            if function in SUBSYSTEM_FUNCTIONS and os.path.basename(filename) == "simulator.py":
+                subsystems[SUBSYSTEM_FUNCTIONS[function]] = round(cumulative * 1000, 3)
+        with open(os.path.join(self.directory, "slow_frames.jsonl"), "a") as f:
+            f.write(json.dumps({
+                "tick": tick, "frame_ms": round(elapsed * 1000, 3), "budget_ms": self.budget * 1000,
+                "subsystems_ms": subsystems, "profile": os.path.basename(path), "time": time.time(),
+            }) + "\n")
+
+        self.profile = cProfile.Profile()
+        self.dumps += 1
+        if self.dumps == self.max_dumps:
+            print(f"Slow frame profiler: kept {self.max_dumps} frames in {self.directory}, stopping")
+        return path
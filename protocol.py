@@ -0,0 +1,88 @@
+"""Wire format shared by the simulation server and the viewer.
+
+Messages are JSON objects, one per line. The server sends a "hello" and a
+"keyframe" with every non-empty tile when a client connects, then one
+"delta" per tick with only the tiles whose record changed. Clients send
+"edit", "undo" and "redo" commands back, and bracket the edits of a drag
+with "begin" and "end" so the whole stroke is one undo step.
+
+A tile record is [row, col, flags, component, room_alpha, pipe_gas,
+o2, co2, n2, damage]. Gases are integers in units of the server's
+precision and damage is in hundredths, so changes smaller than that do
+not generate traffic.
+"""
+import json
+from constants import VACUUM_COLOR, DARK_GRID, GRAY, YELLOW, PIPE_COLOR, GAS_COLORS
+
+PROTOCOL_VERSION = 2
+
+# Tile flags
+WALL = 1
+DOOR = 2
+WIRE = 4
+PIPE = 8
+POWERED = 16
+IN_ROOM = 32
+
+EMPTY_FLAGS = 0
+
+
+def encode_message(message):
+    return (json.dumps(message, separators=(",", ":")) + "\n").encode()
+
+
+def encode_tile(tile, precision):
+    flags = ((WALL if tile.wall else 0) | (DOOR if tile.door else 0) | (WIRE if tile.wire else 0) |
+             (PIPE if tile.pipe else 0) | (POWERED if tile.powered else 0) | (IN_ROOM if tile.room else 0))
+
+    pipe_gas = tile.pipe_network.dominant_gas() if tile.pipe and tile.pipe_network else None
+
+    return [
+        tile.row, tile.col, flags,
+        type(tile.component).__name__ if tile.component else None,
+        tile.room.metrics().overlay_alpha if tile.room else None,
+        pipe_gas,
+        round(tile.gases.o2 / precision),
+        round(tile.gases.co2 / precision),
+        round(tile.gases.n2 / precision),
+        round(tile.damage * 100),
+    ]
+
+
+def is_empty(record):
+    return record[2:] == [EMPTY_FLAGS, None, None, None, 0, 0, 0, 0]
+
+
+def empty_record(row, col):
+    return [row, col, EMPTY_FLAGS, None, None, None, 0, 0, 0, 0]
+
+
+def record_render_state(record, flags_grid, precision):
+    """Turn a record into the render state tuple draw_tiles takes.
+
+    flags_grid holds every tile's flags so wires and pipes can link to
+    their neighbours like they do in the game.
+    """
+    from tile import component_sprite_id
+    from station import COMPONENT_TYPES
+    from autotile import link_mask
+
+    row, col, flags, component, room_alpha, pipe_gas, o2, co2, n2, damage = record
+    color = VACUUM_COLOR if not flags & (WALL | IN_ROOM) else DARK_GRID if not flags & WALL else GRAY
+    if flags & DOOR:
+        color = YELLOW
+
+    wire_mask = link_mask(lambda r, c: flags_grid[r][c] & WIRE, row, col) if flags & WIRE else 0
+    pipe_mask = link_mask(lambda r, c: flags_grid[r][c] & PIPE, row, col) if flags & PIPE else 0
+
+    return (
+        color,
+        bool(flags & POWERED) if flags & WIRE else None,
+        wire_mask,
+        (GAS_COLORS[pipe_gas] if pipe_gas else PIPE_COLOR) if flags & PIPE else None,
+        pipe_mask,
+        component_sprite_id(COMPONENT_TYPES[component], flags & POWERED) if component else None,
+        room_alpha,
+        (o2 * precision, co2 * precision, n2 * precision),
+        damage / 100,
+    )
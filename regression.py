@@ -0,0 +1,346 @@
+"""Numerical regression harness for the gas, power and component pipeline.
+
+Record golden snapshots of a library of reference stations with the current
+engine, then rerun them with constant overrides or a patched engine and
+compare:
+
+    python regression.py record --ticks 3000 --every 300
+    python regression.py compare --set GAS_SOLVER=implicit
+    python regression.py compare --engine my_engine:install --tile-tol 0.5
+
+Stations default to the built-in reference library (see `list`); station
+JSON files can be given instead. `compare` reports per-tile and per-room
+gas error, total gas drift and power-state mismatches at every checkpoint
+and exits with 1 if any station is outside the tolerances.
+
+An engine hook is a "module:function" that is called with each freshly
+loaded Simulator and may replace its methods, e.g. update_gases.
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import constants
+from batch import apply_overrides, parse_override
+
+# Bump when the snapshot contents change so old golden files are rejected
+GOLDEN_VERSION = 1
+
+DEFAULT_GOLDEN_DIR = "golden"
+DEFAULT_TILE_TOLERANCE = 0.01  # Largest per-tile gas difference, per gas
+DEFAULT_ROOM_TOLERANCE = 0.01  # Largest per-room aggregate gas difference, per gas
+DEFAULT_MASS_TOLERANCE = 1e-6  # Largest relative difference in total gas
+DEFAULT_POWER_TOLERANCE = 0  # Tiles allowed to differ in powered state
+
+
+def build_sealed_room(simulator):
+    """A walled room with an internal wall stub and uneven gas, no components: gas must be conserved"""
+    from gas import GasCell
+    grid = simulator.grid
+    for row in range(3, 17):
+        for col in range(3, 17):
+            if row in (3, 16) or col in (3, 16) or (col == 9 and row < 11):
+                grid[row][col].wall = True
+            else:
+                grid[row][col].gases = GasCell((row * 7 + col * 13) % 60, (row * col) % 9, (row + 2 * col) % 30)
+    simulator.create_room(simulator.flood_fill(grid[4][4]))
+
+
+def build_life_support(simulator):
+    """Engine, oxygen generator and plants in one room, with wiring"""
+    from gas import GasCell
+    from components import Engine, OxygenGenerator, Plant
+    grid = simulator.grid
+    for row in range(4, 14):
+        for col in range(4, 16):
+            if row in (4, 13) or col in (4, 15):
+                grid[row][col].wall = True
+            else:
+                grid[row][col].gases = GasCell(40, 5, 20)
+    room = simulator.create_room(simulator.flood_fill(grid[6][6]))
+    for col in range(6, 12):
+        grid[6][col].wire = True
+    for row, col, component_type in [(6, 6, Engine), (6, 11, OxygenGenerator), (10, 7, Plant), (10, 12, Plant)]:
+        simulator.set_component(grid[row][col], component_type(room))
+
+
+def build_vent_loop(simulator):
+    """Two rooms joined by a pipe between an input and an output vent, with a SPAC on the pipe outside"""
+    from gas import GasCell
+    from components import InputVent, OutputVent, Spac12
+    grid = simulator.grid
+    for row in range(2, 10):
+        for col in range(2, 18):
+            if row in (2, 9) or col in (2, 9, 10, 17):
+                grid[row][col].wall = True
+            elif col < 9:
+                grid[row][col].gases = GasCell(80, 2, 10)
+    left = simulator.create_room(simulator.flood_fill(grid[4][4]))
+    right = simulator.create_room(simulator.flood_fill(grid[4][13]))
+    # The pipe leaves the left room, runs below both and comes up into the right one
+    for row in range(5, 15):
+        grid[row][5].pipe = True
+        grid[row][14].pipe = True
+    for col in range(5, 15):
+        grid[14][col].pipe = True
+    simulator.set_component(grid[5][5], InputVent(left))
+    simulator.set_component(grid[5][14], OutputVent(right))
+    simulator.set_component(grid[14][8], Spac12(None))  # On the pipe run below the rooms, feeding it N2
+
+
+def build_breach(simulator):
+    """Gas left in open vacuum next to a room, dissipating and spreading"""
+    from gas import GasCell
+    grid = simulator.grid
+    for row in range(6, 14):
+        for col in range(6, 14):
+            if row in (6, 13) or col in (6, 13):
+                grid[row][col].wall = True
+            else:
+                grid[row][col].gases = GasCell(50, 10, 40)
+    simulator.create_room(simulator.flood_fill(grid[8][8]))
+    for row in range(1, 5):
+        for col in range(1, 19):
+            grid[row][col].gases = GasCell(30, 30, 30)
+
+
+REFERENCE_STATIONS = {
+    "sealed_room": build_sealed_room,
+    "life_support": build_life_support,
+    "vent_loop": build_vent_loop,
+    "breach": build_breach,
+}
+
+
+def reference_station(name):
+    """The station dict of a built-in reference station"""
+    from simulator import Simulator
+    from station import station_to_dict
+    simulator = Simulator(headless=True)
+    REFERENCE_STATIONS[name](simulator)
+    simulator.assign_pipe_networks()
+    return station_to_dict(simulator)
+
+
+def load_stations(paths):
+    """(name, station dict) pairs for the given files, or the reference library"""
+    if not paths:
+        return [(name, reference_station(name)) for name in REFERENCE_STATIONS]
+    stations = []
+    for path in paths:
+        with open(path) as f:
+            stations.append((os.path.splitext(os.path.basename(path))[0], json.load(f)))
+    return stations
+
+
+def load_engine(spec):
+    """Import a "module:function" engine hook"""
+    if not spec:
+        return None
+    module_name, sep, function_name = spec.partition(":")
+    if not sep:
+        raise ValueError(f"Engine hook should be module:function, got {spec!r}")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def checkpoint(simulator):
+    """Everything compared at one checkpoint"""
+    from components import Engine
+    tiles = []
+    mass = 0.0
+    for row in simulator.grid:
+        for tile in row:
+            gases = tile.gases
+            tiles += (gases.o2, gases.co2, gases.n2)
+            mass += gases.o2 + gases.co2 + gases.n2
+    for network in simulator.pipe_networks:
+        mass += network.gases.total()
+    return {
+        "tick": simulator.update_counter,
+        "tiles": tiles,
+        "rooms": [[room.gases.o2, room.gases.co2, room.gases.n2] for room in simulator.rooms],
+        "mass": mass,
+        "powered": sorted(tile.row * constants.COLS + tile.col for tile in simulator.powered_tiles),
+        "engines": [[row, col, simulator.grid[row][col].component.powered]
+                    for row, col in simulator.components.positions(Engine)],
+    }
+
+
+def run_station(station, ticks, every, overrides=None, engine=None):
+    """Run a station headless, returning its checkpoints and the seconds spent ticking"""
+    from simulator import Simulator
+    from station import load_station_dict
+
+    previous = apply_overrides(overrides or {})
+    try:
+        simulator = Simulator(headless=True)
+        load_station_dict(simulator, station)
+        simulator.assign_pipe_networks()
+        simulator.refresh_power_labels()
+        if engine:
+            engine(simulator)
+
+        checkpoints = [checkpoint(simulator)]
+        seconds = 0.0
+        while simulator.update_counter < ticks:
+            start = time.perf_counter()
+            for _ in range(min(every, ticks - simulator.update_counter)):
+                simulator.tick()
+            seconds += time.perf_counter() - start
+            checkpoints.append(checkpoint(simulator))
+        return checkpoints, seconds
+    finally:
+        apply_overrides(previous)
+
+
+def compare_checkpoints(golden, candidate, initial_mass):
+    """Errors of one candidate checkpoint against its golden one"""
+    tile_errors = [abs(a - b) for a, b in zip(golden["tiles"], candidate["tiles"])]
+    room_errors = [abs(a - b) for golden_room, candidate_room in zip(golden["rooms"], candidate["rooms"])
+                   for a, b in zip(golden_room, candidate_room)]
+    mass = golden["mass"]
+    return {
+        "tick": golden["tick"],
+        "tile_max": max(tile_errors, default=0.0),
+        "tile_mean": sum(tile_errors) / len(tile_errors) if tile_errors else 0.0,
+        "room_max": max(room_errors, default=0.0),
+        "rooms_differ": len(golden["rooms"]) != len(candidate["rooms"]),
+        "mass_error": abs(candidate["mass"] - mass) / mass if mass else abs(candidate["mass"]),
+        # How far the candidate's own total moved since the start, expected only with components
+        "mass_drift": abs(candidate["mass"] - initial_mass) / initial_mass if initial_mass else 0.0,
+        "power_mismatches": len(set(golden["powered"]) ^ set(candidate["powered"])) + sum(
+            a != b for a, b in zip(golden["engines"], candidate["engines"])),
+    }
+
+
+def golden_path(directory, name):
+    return os.path.join(directory, f"{name}.json")
+
+
+def record(args):
+    from station import write_json_atomic
+    os.makedirs(args.golden, exist_ok=True)
+    overrides = dict((name, values[0]) for name, values in args.overrides)
+    for name, station in load_stations(args.stations):
+        checkpoints, seconds = run_station(station, args.ticks, args.every, overrides)
+        write_json_atomic({
+            "version": GOLDEN_VERSION, "name": name, "station": station, "ticks": args.ticks,
+            "every": args.every, "overrides": overrides, "seconds": seconds, "checkpoints": checkpoints,
+        }, golden_path(args.golden, name))
+        print(f"{name}: {args.ticks} ticks, {len(checkpoints)} checkpoints, "
+              f"{seconds * 1000 / args.ticks:.3f} ms/tick")
+    return 0
+
+
+def compare(args):
+    overrides = dict((name, values[0]) for name, values in args.overrides)
+    engine = load_engine(args.engine)
+    names = args.names or sorted(os.path.splitext(name)[0] for name in os.listdir(args.golden)
+                                 if name.endswith(".json"))
+    if not names:
+        print(f"No golden snapshots in {args.golden}; run `regression.py record` first")
+        return 1
+
+    failures = 0
+    print(f"{'station':<16}{'tile max':>10}{'tile mean':>11}{'room max':>10}{'mass err':>10}{'drift':>10}"
+          f"{'power':>7}{'ms/tick':>9}{'golden':>8}  result")
+    for name in names:
+        with open(golden_path(args.golden, name)) as f:
+            golden = json.load(f)
+        if golden.get("version") != GOLDEN_VERSION:
+            print(f"{name}: golden snapshot is version {golden.get('version')}, expected {GOLDEN_VERSION}")
+            failures += 1
+            continue
+
+        run_overrides = dict(golden["overrides"], **overrides)
+        checkpoints, seconds = run_station(golden["station"], golden["ticks"], golden["every"],
+                                           run_overrides, engine)
+        results = [compare_checkpoints(a, b, checkpoints[0]["mass"])
+                   for a, b in zip(golden["checkpoints"], checkpoints)]
+        worst = {key: max(result[key] for result in results)
+                 for key in ("tile_max", "tile_mean", "room_max", "mass_error", "mass_drift", "power_mismatches")}
+        problems = []
+        if len(checkpoints) != len(golden["checkpoints"]) or any(result["rooms_differ"] for result in results):
+            problems.append("structure")
+        if worst["tile_max"] > args.tile_tol:
+            problems.append("tiles")
+        if worst["room_max"] > args.room_tol:
+            problems.append("rooms")
+        if worst["mass_error"] > args.mass_tol:
+            problems.append("mass")
+        if worst["power_mismatches"] > args.power_tol:
+            problems.append("power")
+        failures += bool(problems)
+
+        ticks = golden["ticks"] or 1
+        print(f"{name:<16}{worst['tile_max']:>10.2e}{worst['tile_mean']:>11.2e}{worst['room_max']:>10.2e}"
+              f"{worst['mass_error']:>10.2e}{worst['mass_drift']:>10.2e}{worst['power_mismatches']:>7}"
+              f"{seconds * 1000 / ticks:>9.3f}{golden['seconds'] * 1000 / ticks:>8.3f}  "
+              f"{'FAIL ' + ', '.join(problems) if problems else 'ok'}")
+        if problems and args.verbose:
+            for result in results:
+                print(f"    tick {result['tick']:>6}: tile max {result['tile_max']:.2e}, "
+                      f"room max {result['room_max']:.2e}, mass err {result['mass_error']:.2e}, "
+                      f"power {result['power_mismatches']}")
+    return 1 if failures else 0
+
+
+def main(argv=None):
+    def add_shared(parser, top_level):
+        # A subcommand parses into its own namespace, so its --set values are
+        # kept apart and added to the top-level ones below
+        parser.add_argument("--golden", default=DEFAULT_GOLDEN_DIR if top_level else argparse.SUPPRESS,
+                            help=f"golden snapshot directory (default: {DEFAULT_GOLDEN_DIR})")
+        parser.add_argument("--set", dest="overrides" if top_level else "command_overrides",
+                            type=parse_override, action="append", default=[],
+                            metavar="NAME=VALUE", help="override a constant for the run")
+
+    parser = argparse.ArgumentParser(description="Record and compare golden simulation snapshots.")
+    add_shared(parser, True)
+    # The same options are accepted after the command, as in the usage above
+    shared = argparse.ArgumentParser(add_help=False)
+    add_shared(shared, False)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = commands.add_parser("record", parents=[shared],
+                                        help="run stations with the current engine and save snapshots")
+    record_parser.add_argument("stations", nargs="*", help="station JSON files (default: reference library)")
+    record_parser.add_argument("--ticks", type=int, default=3000, help="ticks to run (default: 3000)")
+    record_parser.add_argument("--every", type=int, default=300, help="ticks between checkpoints (default: 300)")
+
+    compare_parser = commands.add_parser("compare", parents=[shared],
+                                         help="rerun golden stations and report the differences")
+    compare_parser.add_argument("names", nargs="*", help="golden station names (default: all)")
+    compare_parser.add_argument("--engine", help="module:function called with each Simulator to patch it")
+    compare_parser.add_argument("--tile-tol", type=float, default=DEFAULT_TILE_TOLERANCE)
+    compare_parser.add_argument("--room-tol", type=float, default=DEFAULT_ROOM_TOLERANCE)
+    compare_parser.add_argument("--mass-tol", type=float, default=DEFAULT_MASS_TOLERANCE)
+    compare_parser.add_argument("--power-tol", type=int, default=DEFAULT_POWER_TOLERANCE)
+    compare_parser.add_argument("-v", "--verbose", action="store_true", help="show every checkpoint of failures")
+
+    commands.add_parser("list", help="list the reference stations")
+    args = parser.parse_args(argv)
+    args.overrides += getattr(args, "command_overrides", [])
+
+    for name, values in args.overrides:
+        if not name.isupper() or not hasattr(constants, name):
+            parser.error(f"unknown constant: {name}")
+        if len(values) != 1:
+            parser.error(f"--set {name} takes a single value here")
+
+    if args.command == "list":
+        for name, build in REFERENCE_STATIONS.items():
+            print(f"{name:<16}{build.__doc__}")
+        return 0
+    if args.command == "record":
+        return record(args)
+    return compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,33 +1,77 @@
 from gas import GasCell
 from constants import MAX_PRESSURE, MACHINE_DAMAGE_RATE, DARK_GRID, WHITE, ORANGE, GREEN, RED, BLUE, YELLOW
 import pygame
+from fonts import get_font
 import math
 
+class RoomMetrics:
+    """Values derived from a room's aggregate gases, shared by every consumer"""
+    def __init__(self, room):
+        gases = room.gases
+        self.total = gases.total()
+        self.pressure = gases.pressure()
+        self.status = room.compute_breathability()
+        if self.total > 0:
+            self.o2_ratio = gases.o2 / self.total
+            self.co2_ratio = gases.co2 / self.total
+            self.n2_ratio = gases.n2 / self.total
+        else:
+            self.o2_ratio = self.co2_ratio = self.n2_ratio = 0.0
+
+        # Predominant gas, ties going to O2 then CO2
+        top = max(gases.o2, gases.co2, gases.n2)
+        self.dominant = 'o2' if top == gases.o2 else 'co2' if top == gases.co2 else 'n2'
+
+        # Alpha of the INSPECT mode room overlay
+        avg_level = (gases.o2 / 100 + self.pressure) / 2
+        self.overlay_alpha = int(128 * avg_level)
+
+
 class Room:
     def __init__(self, tiles):
         self.tiles = tiles
         self.gases = GasCell()
         self.damage = 0
         self.breathable = True
+        # Bumped whenever the aggregate gases change; metrics() is cached per version
+        self.version = 0
+        self.cached_metrics = None
+        self.metrics_version = -1
         for tile in tiles:
             tile.room = self
 
     def pressure(self):
-        return self.gases.pressure()
+        return self.metrics().pressure
     
     def update(self):
         # Check pressure damage
         if self.pressure() > MAX_PRESSURE:
             self.damage += MACHINE_DAMAGE_RATE
             # Implement additional damage effects here
+
+    def set_gases(self, gases: GasCell):
+        if gases != self.gases:
+            self.gases = gases
+            self.version += 1
     
     def add_gas(self, gas_type: str, amount: float):
         self.gases.add_gas(gas_type, amount)
+        self.version += 1
     
     def consume_gas(self, gas_type: str, amount: float):
         self.gases.consume_gas(gas_type, amount)
+        self.version += 1
+
+    def metrics(self) -> RoomMetrics:
+        if self.metrics_version != self.version:
+            self.cached_metrics = RoomMetrics(self)
+            self.metrics_version = self.version
+        return self.cached_metrics
 
     def get_breathability(self):
+        return self.metrics().status
+
+    def compute_breathability(self):
         o2_level = self.gases.o2
         co2_level = self.gases.co2
         n2_level = self.gases.n2
@@ -57,7 +101,7 @@ class RoomInfoPopup:
         self.target_rect = pygame.Rect(pos[0], pos[1], 300, 200)
         self.rect = pygame.Rect(pos[0], pos[1], 0, 0)  # Start with zero size
         self.visible = True
-        self.font = pygame.font.SysFont('arial', 16)
+        self.font = get_font(None, 16)
         
         # Animation properties
         self.anim_progress = 0
@@ -66,9 +110,9 @@ class RoomInfoPopup:
         self.duration = 250  # animation duration in ms
         self.opacity = 0
         
-    def update(self):
+    def update(self, animate=True):
         current_time = pygame.time.get_ticks()
-        age = (current_time - self.start_time) / self.duration
+        age = (current_time - self.start_time) / self.duration if animate else 1.0
         
         if self.state == "entering":
             self.anim_progress = min(1.0, age)
@@ -103,11 +147,11 @@ class RoomInfoPopup:
     def ease_out_cubic(self, x):
         return 1 - pow(1 - x, 3)
             
-    def draw(self, win):
+    def draw(self, win, animate=True):
         if not self.visible:
             return
             
-        self.update()
+        self.update(animate)
         
         # Create a surface for the popup with alpha channel
         popup_surface = pygame.Surface((self.rect.width, self.rect.height), pygame.SRCALPHA)
@@ -127,7 +171,8 @@ class RoomInfoPopup:
         pygame.draw.rect(popup_surface, (*DARK_GRID, self.opacity), pressure_container)
         pygame.draw.rect(popup_surface, border_color, pressure_container, 1)
         
-        pressure_height = min(self.room.pressure() / MAX_PRESSURE, 1) * 150
+        metrics = self.room.metrics()
+        pressure_height = min(metrics.pressure / MAX_PRESSURE, 1) * 150
         pressure_rect = pygame.Rect(
             pressure_container.x,
             pressure_container.bottom - pressure_height,
@@ -146,8 +191,8 @@ class RoomInfoPopup:
             f"CO2: {self.room.gases.co2:.1f}",
             f"N2: {self.room.gases.n2:.1f}",
             f"Damage: {self.room.damage:.1%}",
-            f"Status: {self.room.get_breathability()}",  # Add breathing status
-            f"Pressure: {self.room.pressure():.1f}/{MAX_PRESSURE}"
+            f"Status: {metrics.status}",  # Add breathing status
+            f"Pressure: {metrics.pressure:.1f}/{MAX_PRESSURE}"
         ]
         
         for text in texts:
@@ -156,7 +201,7 @@ class RoomInfoPopup:
             y += 20
         
         # Draw colored status indicator
-        status = self.room.get_breathability()
+        status = metrics.status
         status_color = GREEN if status == "Very Breathable" else \
                       BLUE if status == "Breathable" else \
                       YELLOW if status == "Barely Breathable" else \
@@ -176,18 +221,17 @@ class RoomInfoPopup:
         pygame.draw.rect(popup_surface, (*DARK_GRID, self.opacity), (x, y, bar_width, bar_height))
         pygame.draw.rect(popup_surface, border_color, (x, y, bar_width, bar_height), 1)
         
-        total_gas = self.room.gases.total()
-        if total_gas > 0:
+        if metrics.total > 0:
             # O2 bar (green)
-            o2_width = (self.room.gases.o2 / total_gas) * bar_width
+            o2_width = metrics.o2_ratio * bar_width
             pygame.draw.rect(popup_surface, (*GREEN, self.opacity), (x, y, o2_width, bar_height))
             
             # CO2 bar (red)
-            co2_width = (self.room.gases.co2 / total_gas) * bar_width
+            co2_width = metrics.co2_ratio * bar_width
             pygame.draw.rect(popup_surface, (*RED, self.opacity), (x + o2_width, y, co2_width, bar_height))
             
             # N2 bar (blue)
-            n2_width = (self.room.gases.n2 / total_gas) * bar_width
+            n2_width = metrics.n2_ratio * bar_width
             pygame.draw.rect(popup_surface, (*BLUE, self.opacity), (x + o2_width + co2_width, y, n2_width, bar_height))
         
         win.blit(popup_surface, self.rect)
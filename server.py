@@ -0,0 +1,279 @@
+"""Headless simulation server for local viewers.
+
+Runs one station and streams it to any number of viewers on a local
+socket, sending only the tiles that changed each tick:
+
+    python server.py station.json --port 7777 --precision 0.1
+    python viewer.py --port 7777
+
+See protocol.py for the message format.
+"""
+import argparse
+import json
+import os
+import selectors
+import socket
+import sys
+import time
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+from constants import SERVER_HOST, SERVER_PORT, SERVER_GAS_PRECISION, SERVER_MAX_CLIENT_BUFFER, SIM_TICK_RATE
+from protocol import PROTOCOL_VERSION, encode_message, encode_tile, is_empty
+
+
+class Client:
+    def __init__(self, sock, address):
+        self.sock = sock
+        self.address = address
+        self.inbox = b""
+        self.outbox = bytearray()
+        self.in_batch = False  # Between the "begin" and "end" of a drag
+
+
+class SimulationServer:
+    """Ticks a headless simulator and broadcasts per-tick tile deltas.
+
+    Everything runs on one thread with a selector, so edits from clients
+    are applied between ticks with no locking. The last record sent for
+    every tile is kept once, not per client: all clients get the same
+    deltas, and a new client starts from a keyframe of that same state.
+    Clients that fall more than SERVER_MAX_CLIENT_BUFFER bytes behind are
+    dropped rather than letting their backlog grow without bound.
+
+    Only tiles named in the simulator's change sets are re-encoded each
+    tick. The tracker is set to the server's precision so it flags a tile
+    exactly when its gas record would change.
+    """
+    def __init__(self, simulator, host=SERVER_HOST, port=SERVER_PORT,
+                 precision=SERVER_GAS_PRECISION, tick_rate=SIM_TICK_RATE):
+        self.simulator = simulator
+        self.precision = precision
+        self.tick_interval = 1.0 / tick_rate
+        self.sent = {}  # (row, col) -> last record broadcast, for non-empty tiles
+        self.dirty = None  # Tiles to re-encode, or None to scan them all
+        simulator.changes.precision = precision
+        simulator.changes.subscribe(self.collect)
+        self.clients = {}
+        self.selector = selectors.DefaultSelector()
+
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind((host, port))
+        self.listener.listen()
+        self.listener.setblocking(False)
+        self.selector.register(self.listener, selectors.EVENT_READ)
+        self.address = self.listener.getsockname()
+        self.running = False
+
+    def collect(self, changes):
+        """Change set subscriber: remember which tiles may have new records"""
+        if self.dirty is None:
+            return
+        dirty = self.dirty
+        dirty.update(changes)
+        for room in changes.rooms:
+            dirty.update((tile.row, tile.col) for tile in room.tiles)
+        for network in changes.pipe_networks:
+            dirty.update((tile.row, tile.col) for tile in network.tiles)
+
+    def delta(self):
+        """Records for every tile that changed since the last call"""
+        grid = self.simulator.grid
+        if self.dirty is None:
+            candidates = [tile for grid_row in grid for tile in grid_row]
+        else:
+            candidates = [grid[row][col] for row, col in sorted(self.dirty)]
+        self.dirty = set()
+
+        changed = []
+        sent = self.sent
+        for tile in candidates:
+            key = (tile.row, tile.col)
+            record = encode_tile(tile, self.precision)
+            previous = sent.get(key)
+            if previous is None:
+                if not is_empty(record):
+                    sent[key] = record
+                    changed.append(record)
+            elif record != previous:
+                if is_empty(record):
+                    del sent[key]
+                else:
+                    sent[key] = record
+                changed.append(record)
+        return changed
+
+    def broadcast(self, message):
+        data = encode_message(message)
+        for client in list(self.clients.values()):
+            self.queue(client, data)
+
+    def queue(self, client, data):
+        client.outbox += data
+        if len(client.outbox) > SERVER_MAX_CLIENT_BUFFER:
+            print(f"Dropping {client.address}: too far behind")
+            self.disconnect(client)
+            return
+        self.selector.modify(client.sock, selectors.EVENT_READ | selectors.EVENT_WRITE)
+
+    def accept(self):
+        sock, address = self.listener.accept()
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        client = Client(sock, address)
+        self.clients[sock] = client
+        self.selector.register(sock, selectors.EVENT_READ)
+        # The keyframe is the state every other client has already been sent
+        self.queue(client, encode_message({
+            "type": "hello", "version": PROTOCOL_VERSION, "precision": self.precision,
+            "rows": len(self.simulator.grid), "cols": len(self.simulator.grid[0]),
+        }))
+        self.queue(client, encode_message({
+            "type": "keyframe", "tick": self.simulator.update_counter, "tiles": list(self.sent.values()),
+        }))
+
+    def disconnect(self, client):
+        if self.clients.pop(client.sock, None) is None:
+            return
+        if client.in_batch:
+            # Close a drag the client will never finish
+            client.in_batch = False
+            self.simulator.end_batch()
+        self.selector.unregister(client.sock)
+        client.sock.close()
+
+    def read(self, client):
+        try:
+            data = client.sock.recv(65536)
+        except ConnectionError:
+            data = b""
+        if not data:
+            self.disconnect(client)
+            return
+        client.inbox += data
+        *lines, client.inbox = client.inbox.split(b"\n")
+        for line in lines:
+            if line.strip():
+                try:
+                    self.handle(client, json.loads(line))
+                except (ValueError, KeyError, TypeError) as e:
+                    print(f"Bad command from {client.address}: {e}")
+
+    def write(self, client):
+        try:
+            sent = client.sock.send(client.outbox)
+        except (BlockingIOError, InterruptedError):
+            return
+        except ConnectionError:
+            self.disconnect(client)
+            return
+        del client.outbox[:sent]
+        if not client.outbox:
+            self.selector.modify(client.sock, selectors.EVENT_READ)
+
+    def handle(self, client, command):
+        """Apply a command from a client to the simulation"""
+        from enums import Tool
+        simulator = self.simulator
+        if command["type"] == "edit":
+            simulator.apply_tools([tuple(cell) for cell in command["cells"]], Tool(command["tool"]))
+        elif command["type"] == "begin":
+            if not client.in_batch:
+                client.in_batch = True
+                simulator.begin_batch()
+        elif command["type"] == "end":
+            if client.in_batch:
+                client.in_batch = False
+                simulator.end_batch()
+        elif command["type"] == "undo":
+            simulator.history.undo()
+        elif command["type"] == "redo":
+            simulator.history.redo()
+        else:
+            raise ValueError(f"Unknown command type: {command['type']}")
+
+    def poll(self, timeout):
+        for key, events in self.selector.select(timeout):
+            if key.fileobj is self.listener:
+                self.accept()
+                continue
+            client = self.clients.get(key.fileobj)
+            if client and events & selectors.EVENT_READ:
+                self.read(client)
+            client = self.clients.get(key.fileobj)
+            if client and events & selectors.EVENT_WRITE:
+                self.write(client)
+
+    def step(self):
+        self.simulator.tick()
+        changed = self.delta()
+        if changed:
+            self.broadcast({"type": "delta", "tick": self.simulator.update_counter, "tiles": changed})
+
+    def serve(self, ticks=None):
+        """Tick at the tick rate, handling clients in between, until stopped or after ticks"""
+        self.running = True
+        self.delta()  # Establish the state keyframes are built from
+        next_tick = time.perf_counter()
+        while self.running and (ticks is None or ticks > 0):
+            self.poll(max(next_tick - time.perf_counter(), 0))
+            if time.perf_counter() < next_tick:
+                continue
+            self.step()
+            if ticks is not None:
+                ticks -= 1
+            next_tick += self.tick_interval
+            if next_tick < time.perf_counter() - self.tick_interval:
+                next_tick = time.perf_counter()  # Too far behind, drop ticks rather than racing to catch up
+
+    def close(self):
+        for client in list(self.clients.values()):
+            self.disconnect(client)
+        self.selector.unregister(self.listener)
+        self.listener.close()
+        self.selector.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a station headless and stream it to viewers.")
+    parser.add_argument("station", nargs="?", help="station JSON file to load (default: empty map)")
+    parser.add_argument("--host", default=SERVER_HOST, help=f"address to listen on (default: {SERVER_HOST})")
+    parser.add_argument("--port", type=int, default=SERVER_PORT, help=f"port to listen on (default: {SERVER_PORT})")
+    parser.add_argument("--precision", type=float, default=SERVER_GAS_PRECISION,
+                        help=f"gas quantisation step sent to viewers (default: {SERVER_GAS_PRECISION})")
+    parser.add_argument("--tick-rate", type=float, default=SIM_TICK_RATE, help="ticks per second")
+    parser.add_argument("--export", metavar="PATH", help="also publish live state to a memory-mapped file (see export.py)")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on this port (see metrics.py)")
+    parser.add_argument("--metrics-file", metavar="PATH", help="rewrite Prometheus metrics into this file")
+    args = parser.parse_args(argv)
+
+    from simulator import Simulator
+    from station import load_station
+
+    simulator = Simulator(headless=True)
+    if args.station:
+        load_station(simulator, args.station)
+    if args.export:
+        from export import StateExport
+        simulator.exporter = StateExport(simulator, args.export)
+    if args.metrics_port is not None or args.metrics_file:
+        from metrics import Metrics
+        simulator.metrics = Metrics(simulator, path=args.metrics_file, host=args.host, port=args.metrics_port)
+    server = SimulationServer(simulator, args.host, args.port, args.precision, args.tick_rate)
+    print(f"Serving on {server.address[0]}:{server.address[1]}")
+    try:
+        server.serve()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        if simulator.exporter:
+            simulator.exporter.close()
+        if simulator.metrics:
+            simulator.metrics.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,40 @@
+def line_cells(start, end):
+    """4-connected grid cells on the line from start to end (row, col), inclusive"""
+    (row0, col0), (row1, col1) = start, end
+    d_row, d_col = abs(row1 - row0), abs(col1 - col0)
+    step_row = 1 if row1 >= row0 else -1
+    step_col = 1 if col1 >= col0 else -1
+    error = d_col - d_row
+    cells = []
+    row, col = row0, col0
+    while True:
+        cells.append((row, col))
+        if (row, col) == (row1, col1):
+            return cells
+        doubled = 2 * error
+        move_col = doubled > -d_row
+        move_row = doubled < d_col
+        if move_col:
+            error -= d_row
+            col += step_col
+        if move_row:
+            if move_col:
+                # Step through a side cell so walls drawn diagonally stay airtight
+                cells.append((row, col))
+            error += d_col
+            row += step_row
+
+
+def rect_cells(start, end, filled=False):
+    """Grid cells of the rectangle with opposite corners start and end"""
+    row0, row1 = sorted((start[0], end[0]))
+    col0, col1 = sorted((start[1], end[1]))
+    if filled:
+        return [(row, col) for row in range(row0, row1 + 1) for col in range(col0, col1 + 1)]
+    cells = [(row0, col) for col in range(col0, col1 + 1)]
+    if row1 > row0:
+        cells += [(row1, col) for col in range(col0, col1 + 1)]
+    cells += [(row, col0) for row in range(row0 + 1, row1)]
+    if col1 > col0:
+        cells += [(row, col1) for row in range(row0 + 1, row1)]
+    return cells
@@ -4,55 +4,105 @@ import math
 from typing import List, Set
 from enum import Enum
 from constants import *
-from enums import Mode, Tool
+from enums import Mode, Tool, Shape
 from gas import GasCell
 from room import Room, RoomInfoPopup
 from components import Engine, OxygenGenerator, InputVent, OutputVent, Plant, Spac12, PipeNetwork  # Ensure PipeNetwork is imported
 from snackbar import Snackbar
-from tile import Tile
+from tile import Tile, draw_tiles
 import time
 from ui import UI
-from particle import Particle  # Add this import
+from fonts import get_font
+from particle import ParticleStore
+from spatial_index import ComponentIndex
+from history import EditHistory
+from shapes import line_cells, rect_cells
+from camera import Camera
+from changes import ChangeTracker
+from diffusion import GasAdjacency, explicit_diffuse, implicit_diffuse
+from autotile import LinkMasks
 
 class Simulator:
-    def __init__(self):
-        pygame.init()
-        self.win = pygame.display.set_mode((WIDTH, HEIGHT))
-        pygame.display.set_caption("Pressurex V0.4")
-        self.clock = pygame.time.Clock()
+    def __init__(self, headless=False):
+        # Headless simulators have no window, fonts or UI and are driven by tick()
+        self.headless = headless
+        if not headless:
+            pygame.init()
+            self.win = pygame.display.set_mode((WIDTH, HEIGHT))
+            pygame.display.set_caption("Pressurex V0.4")
+            self.clock = pygame.time.Clock()
+
+            self.font = get_font('./fonts/font.ttf', 20)
+        else:
+            self.win = None
+            self.clock = None
+            self.font = None
 
-        # Initialize font with proper error handling
-        try:
-            self.font = pygame.font.Font('./fonts/font.ttf', 20)
-        except (FileNotFoundError, RuntimeError) as e:
-            print(f"Could not load main font: {e}")
-            self.font = pygame.font.SysFont('arial', 20)
-        
         self.mode = Mode.CREATE
         self.selected_tool = Tool.WALL
         self.grid = [[Tile(row, col, self) for col in range(COLS)] for row in range(ROWS)]
+        self.links = LinkMasks(self.grid)  # Wire and pipe connection masks, for drawing
         self.rooms = []
         self.selected_tiles = []
         self.mouse_held = False
+        self.drag_button = None  # Mouse button whose release ends the drag
         self.last_modified_pos = None
         self.powered_tiles = set()
         self.update_counter = 0
+        self.topology_version = 0  # Bumped whenever walls, doors, pipes, components or rooms change
+        self.pipe_topology_version = None
+        self.pipe_networks = []
+        self.gas_adjacency = None  # Open-tile edges for diffusion, rebuilt when the topology changes
+        self.components = ComponentIndex()
+        self.history = EditHistory(self)
+        self.changed_chunks = set()  # Chunks whose structure changed since the last autosave snapshot
+        self.changes = ChangeTracker()  # Publishes what changed each tick to subscribers
+        self.batch_depth = 0
+        self.draw_shape = Shape.FREEHAND
+        self.stroke_start = None  # Anchor and current end of a line or rectangle drag
+        self.stroke_end = None
+        self.prefab = None  # Last captured prefab and the rotation it is stamped with
+        self.prefab_turns = 0
+        self.gas_lod = None
+        if GAS_LOD_ENABLED:
+            # Optional systems are imported only when turned on, to keep startup light
+            from gas_lod import GasLOD
+            self.gas_lod = GasLOD(self)
         self.active_popup = None
         self.closing_popup = None
-        self.snackbar = Snackbar(WIDTH, HEIGHT)
+        self.snackbar = Snackbar(WIDTH, HEIGHT) if not headless else None
         
         # Initialize UI
-        self.ui = UI(self.win, self.font)
-        
-        # Initialize all tiles as vacuum (no room)
-        for row in self.grid:
-            for tile in row:
-                tile.room = None
-                tile.gases = GasCell()
-                # Initialize the tile as vacuum
-                self.update_vacuum_state(tile)
+        self.ui = UI(self.win, self.font) if not headless else None
+        self.camera = Camera() if not headless else None
+        self.panning = False  # Middle mouse drag pans the camera
+        self.worker = None  # Simulation thread, started by run() when SIM_THREAD_ENABLED
+        self.autosaver = None
+        if AUTOSAVE_ENABLED and not headless:
+            from autosave import Autosaver
+            self.autosaver = Autosaver(self)
+        self.frame_budget = None
+        if FRAME_BUDGET_ENABLED and not headless:
+            from framebudget import FrameBudget
+            self.frame_budget = FrameBudget()
+        self.exporter = None
+        if EXPORT_ENABLED:
+            from export import StateExport
+            self.exporter = StateExport(self, EXPORT_PATH)
+        self.map_layer = None  # Tiles kept between frames while the frame budget slows map redraws
+        self.map_view = None
+        self.map_frames = 0
         
-        self.particles = []  # Initialize particle list
+        # New tiles already start as empty vacuum (no room, no gas), so there is
+        # nothing to flood fill here; rooms are only found when walls enclose them
+        # Particles are only visual, so headless runs keep none
+        self.particles = ParticleStore(PARTICLE_LIMIT if not headless else 0)
+
+        # Last, since metrics samples the finished simulator straight away
+        self.metrics = None
+        if METRICS_ENABLED:
+            from metrics import Metrics
+            self.metrics = Metrics(self)
 
     def ease_out_cubic(self, x):
         return 1 - pow(1 - x, 3)
@@ -95,11 +145,15 @@ class Simulator:
         """Create a new room from a set of tiles"""
         if not tiles:
             return None
-            
+
+        for tile in tiles:
+            self.history.touch(tile.row, tile.col)
         room = Room(tiles)
         self.rooms.append(room)
         for tile in tiles:
             tile.room = room
+        self.topology_version += 1
+        self.changes.room_updated(room, force=True)
         return room
 
     def handle_click(self, pos, is_held=False):
@@ -144,178 +198,245 @@ class Simulator:
         
         # Only process grid clicks if within game area
         if 0 <= game_pos[0] < GRID_SIZE:
-            # Convert to integers for grid indices
-            row = int(game_pos[1] // TILE_SIZE)
-            col = int(game_pos[0] // TILE_SIZE)
+            row, col = self.camera.screen_to_tile(game_pos)
             
             # Ensure coordinates are within grid bounds
             if 0 <= row < ROWS and 0 <= col < COLS:
-                if is_held and (row, col) == self.last_modified_pos:
-                    return
-                    
-                self.last_modified_pos = (row, col)
-                tile = self.grid[row][col]
-                
-                if self.mode == Mode.CREATE:
-                    if self.selected_tool == Tool.DELETE:
-                        # Delete walls, doors, wires, and pipes
-                        if tile.component:
-                            tile.component = None
-                            tile.damage = 0  # Reset damage when component is removed
-                        if tile.wire or tile.pipe:
-                            tile.wire = False
-                            tile.pipe = False
-                        tile.door = False
-                        if tile.wall:  # Only remove wall if it exists
-                            tile.wall = False
-                            tile.damage = 0
-                    elif self.selected_tool == Tool.WIRE:
-                        tile.wire = True
-                        self.update_power_network()
-                    elif self.selected_tool == Tool.WALL:
-                        tile.wall = True
-                        tile.door = False
-                        tile.wire = False
-                        tile.pipe = False
-                        tile.component = None
-                    elif self.selected_tool == Tool.DOOR:
-                        tile.door = True
-                        tile.wall = False
-                        tile.component = None
-                    elif self.selected_tool in [Tool.ENGINE, Tool.OXYGEN, Tool.VENT_IN, Tool.VENT_OUT, 
-                                             Tool.PLANT, Tool.SPAC, Tool.PIPE]:
-                        if self.selected_tool == Tool.PIPE:
-                            tile.pipe = True
+                if self.mode == Mode.INSPECT:
+                    # Popups belong to the main thread, which draws them
+                    self.inspect_tile(row, col, game_pos)
+                else:
+                    # Edits go to the thread that owns the world
+                    self.submit(self.click_tile, row, col, is_held)
+
+    def click_tile(self, row, col, is_held=False):
+        """Apply a click or drag on a map tile in the current mode"""
+        if is_held and (row, col) == self.last_modified_pos:
+            return
+        
+        previous_pos = self.last_modified_pos
+        self.last_modified_pos = (row, col)
+    
+        if self.mode == Mode.CREATE:
+            if self.selected_tool == Tool.STAMP:
+                if not is_held:
+                    self.stamp_prefab(row, col)
+            elif self.draw_shape == Shape.FREEHAND and self.selected_tool != Tool.CAPTURE:
+                # Fill in the tiles a fast drag skipped between mouse samples
+                start = previous_pos if is_held and previous_pos else (row, col)
+                self.apply_tools(line_cells(start, (row, col)), self.selected_tool)
+            else:
+                # Lines and rectangles are applied when the mouse is released
+                if not is_held:
+                    self.stroke_start = (row, col)
+                self.stroke_end = (row, col)
+
+    def inspect_tile(self, row, col, game_pos):
+        """Open the room info popup for a tile, or close it for a tile outside any room"""
+        room = self.grid[row][col].room
+        if not room:
+            if self.active_popup:
+                self.closing_popup = self.active_popup
+                self.closing_popup.close()
+                self.active_popup = None
+        # Only show popup and snackbar if we're not already inspecting this room
+        elif not self.active_popup or self.active_popup.room != room:
+            if self.active_popup:
+                self.closing_popup = self.active_popup
+                self.closing_popup.close()
+            self.active_popup = RoomInfoPopup(room, (game_pos[0], game_pos[1]))
+            self.notify("Room inspected.")
+
+    def begin_batch(self):
+        """Defer connectivity recomputes until the matching end_batch.
+
+        Batches nest, and everything applied inside the outermost one is a
+        single undo step.
+        """
+        if self.batch_depth == 0:
+            self.history.begin()
+        self.batch_depth += 1
+
+    def end_batch(self):
+        if self.batch_depth == 0:
+            return  # Already closed by close_batches
+        self.batch_depth -= 1
+        if self.batch_depth == 0:
+            self.assign_pipe_networks()
+            self.refresh_power_labels()
+            self.history.commit()
+
+    def close_batches(self):
+        """Close every open batch at once, committing its edit.
+
+        Undo and redo call this so that a batch left open, say by a release
+        that never arrived, cannot keep the history locked for the rest of
+        the session. Any end_batch still to come is then ignored.
+        """
+        if self.batch_depth > 0:
+            self.batch_depth = 1
+            self.end_batch()
+
+    def apply_tools(self, positions, tool):
+        """Apply a construction tool to many (row, col) positions with one recompute"""
+        self.begin_batch()
+        try:
+            for row, col in positions:
+                if 0 <= row < ROWS and 0 <= col < COLS:
+                    self.apply_tool(self.grid[row][col], tool)
+        finally:
+            self.end_batch()
+
+    def stroke_cells(self, start, end):
+        """Tiles covered by a line or rectangle drag from start to end"""
+        if start is None or end is None:
+            return []
+        if self.selected_tool == Tool.CAPTURE:
+            return rect_cells(start, end)
+        if self.draw_shape == Shape.LINE:
+            return line_cells(start, end)
+        # Delete clears the whole area, every other tool draws the outline
+        return rect_cells(start, end, filled=self.selected_tool == Tool.DELETE)
+
+    def finish_stroke(self):
+        if self.mode == Mode.CREATE and self.stroke_start is not None:
+            if self.selected_tool == Tool.CAPTURE:
+                from prefab import Prefab
+                self.prefab = Prefab.capture(self, self.stroke_start, self.stroke_end)
+                self.prefab_turns = 0
+                self.notify(f"Captured {self.prefab.rows}x{self.prefab.cols} prefab.")
+            elif self.draw_shape != Shape.FREEHAND:
+                self.apply_tools(self.stroke_cells(self.stroke_start, self.stroke_end), self.selected_tool)
+        self.stroke_start = None
+        self.stroke_end = None
+
+    def stamp_prefab(self, row, col):
+        if not self.prefab:
+            self.notify("Capture a prefab first!")
+            return
+        placed, total = self.prefab.stamp(self, row, col, self.prefab_turns)
+        if placed < total:
+            self.notify(f"Prefab stamped, {total - placed} components did not fit.")
+        else:
+            self.notify("Prefab stamped.")
+
+    def draw_stroke_preview(self, surface, snapshot=None):
+        if self.mode != Mode.CREATE:
+            return
+        # The worker owns the drag and the prefab, so draw them as of its last snapshot
+        source = snapshot or self
+        prefab = source.prefab
+        if self.selected_tool == Tool.STAMP and prefab:
+            # Outline the footprint the prefab would cover under the mouse
+            mouse_x, mouse_y = pygame.mouse.get_pos()
+            row, col = self.camera.screen_to_tile((mouse_x - self.ui.game_view_offset, mouse_y))
+            height, width = prefab.size(self.prefab_turns)
+            pygame.draw.rect(surface, UI_ACCENT, self.camera.tile_rect(row, col, height, width), 2)
+            return
+        if not self.mouse_held:
+            return
+        row0, col0, row1, col1 = self.camera.visible_tiles()
+        for row, col in self.stroke_cells(source.stroke_start, source.stroke_end):
+            if row0 <= row <= row1 and col0 <= col <= col1:
+                pygame.draw.rect(surface, UI_ACCENT, self.camera.tile_rect(row, col), 2)
+
+    def apply_tool(self, tile, tool):
+        """Apply a construction tool to a single tile, inside a begin_batch/end_batch pair"""
+        self.history.touch(tile.row, tile.col)
+        self.topology_version += 1
+        if tool == Tool.DELETE:
+            # Delete walls, doors, wires, and pipes
+            if tile.component:
+                self.set_component(tile, None)
+                tile.damage = 0  # Reset damage when component is removed
+            if tile.wire or tile.pipe:
+                tile.wire = False
+                tile.pipe = False
+            tile.door = False
+            if tile.wall:  # Only remove wall if it exists
+                tile.wall = False
+                tile.damage = 0
+        elif tool == Tool.WIRE:
+            tile.wire = True  # Power labels are refreshed once the batch ends
+        elif tool == Tool.WALL:
+            tile.wall = True
+            tile.door = False
+            tile.wire = False
+            tile.pipe = False
+            self.set_component(tile, None)
+        elif tool == Tool.DOOR:
+            tile.door = True
+            tile.wall = False
+            self.set_component(tile, None)
+        elif tool in [Tool.ENGINE, Tool.OXYGEN, Tool.VENT_IN, Tool.VENT_OUT, 
+                      Tool.PLANT, Tool.SPAC, Tool.PIPE]:
+            if tool == Tool.PIPE:
+                tile.pipe = True
+            else:
+                if not tile.wall and not tile.door:
+                    if tool == Tool.SPAC:
+                        # For SPAC, we want to place it in vacuum (no room)
+                        if not tile.room:
+                            self.set_component(tile, Spac12(None))
+                            self.notify(f"{tool.value} placed successfully.")
                         else:
-                            if not tile.wall and not tile.door:
-                                if self.selected_tool == Tool.SPAC:
-                                    # For SPAC, we want to place it in vacuum (no room)
-                                    if not tile.room:
-                                        tile.component = Spac12(None)
-                                        tile.component.tile = tile
-                                        self.snackbar.show(f"{self.selected_tool.value} placed successfully.")
-                                    else:
-                                        self.snackbar.show("SPAC-12 can only be placed in vacuum!")
-                                else:
-                                    room_tiles = self.flood_fill(tile)
-                                    if room_tiles:  # Only create room if enclosed
-                                        # Create room if tile isn't already in one
-                                        room = tile.room or self.create_room(room_tiles)
-                                        
-                                        if self.selected_tool == Tool.ENGINE:
-                                            tile.component = Engine(room)
-                                        elif self.selected_tool == Tool.OXYGEN:
-                                            tile.component = OxygenGenerator(room)
-                                        elif self.selected_tool == Tool.VENT_IN:
-                                            tile.component = InputVent(room)
-                                        elif self.selected_tool == Tool.VENT_OUT:
-                                            tile.component = OutputVent(room)
-                                        elif self.selected_tool == Tool.PLANT:
-                                            tile.component = Plant(room)
-                                        
-                                        if tile.component:
-                                            tile.component.tile = tile
-                                            self.snackbar.show(f"{self.selected_tool.value} placed successfully.")
-                    
-                elif self.mode == Mode.INSPECT:
-                    # Close popup when clicking a non-room tile
-                    if not tile.room:
-                        if self.active_popup:
-                            self.closing_popup = self.active_popup
-                            self.closing_popup.close()
-                            self.active_popup = None
+                            self.notify("SPAC-12 can only be placed in vacuum!")
                     else:
-                        # Only show popup and snackbar if we're not already inspecting this room
-                        if not self.active_popup or self.active_popup.room != tile.room:
-                            if self.active_popup:
-                                self.closing_popup = self.active_popup
-                                self.closing_popup.close()
-                            self.active_popup = RoomInfoPopup(tile.room, (game_pos[0], game_pos[1]))
-                            self.snackbar.show("Room inspected.")
+                        room_tiles = self.flood_fill(tile)
+                        if room_tiles:  # Only create room if enclosed
+                            # Create room if tile isn't already in one
+                            room = tile.room or self.create_room(room_tiles)
+                            
+                            component = None
+                            if tool == Tool.ENGINE:
+                                component = Engine(room)
+                            elif tool == Tool.OXYGEN:
+                                component = OxygenGenerator(room)
+                            elif tool == Tool.VENT_IN:
+                                component = InputVent(room)
+                            elif tool == Tool.VENT_OUT:
+                                component = OutputVent(room)
+                            elif tool == Tool.PLANT:
+                                component = Plant(room)
+                            
+                            if component:
+                                self.set_component(tile, component)
+                                self.notify(f"{tool.value} placed successfully.")
 
     def update_gases(self):
-        # Faster gas dissipation in vacuum
-        VACUUM_DISSIPATION_RATE = 0.5  # Adjust this value for faster/slower dissipation
-        
-        for row in range(ROWS):
-            for col in range(COLS):
-                tile = self.grid[row][col]
-                if not tile.room and not tile.wall:  # Vacuum tiles
-                    # Rapidly decrease gas levels
-                    tile.gases.o2 *= (1 - VACUUM_DISSIPATION_RATE)
-                    tile.gases.co2 *= (1 - VACUUM_DISSIPATION_RATE)
-                    tile.gases.n2 *= (1 - VACUUM_DISSIPATION_RATE)
-                    
-                    # Clean up very small values
-                    if tile.gases.o2 < 0.01: tile.gases.o2 = 0
-                    if tile.gases.co2 < 0.01: tile.gases.co2 = 0
-                    if tile.gases.n2 < 0.01: tile.gases.n2 = 0
-
-        # Create copy of current gas state
-        old_gases = [[GasCell() for _ in range(COLS)] for _ in range(ROWS)]
-        for row in range(ROWS):
-            for col in range(COLS):
-                tile = self.grid[row][col]
-                old_gases[row][col] = GasCell(tile.gases.o2, tile.gases.co2, tile.gases.n2)
-
-        # Update each tile's gases based on neighbors
-        for row in range(ROWS):
-            for col in range(COLS):
-                tile = self.grid[row][col]
-                if tile.wall or tile.pipe:  # Skip walls and pipes
-                    continue
-
-                # If this is a pipe tile, only interact with other pipes and components
-                if tile.pipe:
-                    for dr, dc in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
-                        new_row, new_col = row + dr, col + dc
-                        if (0 <= new_row < ROWS and 0 <= new_col < COLS):
-                            neighbor = self.grid[new_row][new_col]
-                            
-                            # Only allow pipe-to-pipe or pipe-to-component gas transfer
-                            if neighbor.pipe or (neighbor.component and not isinstance(neighbor.component, InputVent)):
-                                curr_gas = old_gases[row][col]
-                                neighbor_gas = old_gases[new_row][new_col]
-                                spread_rate = GAS_SPREAD_RATE
-                                
-                                for gas_type in ['o2', 'co2', 'n2']:
-                                    curr_val = getattr(curr_gas, gas_type)
-                                    neighbor_val = getattr(neighbor_gas, gas_type)
-                                    diff = (curr_val - neighbor_val) * spread_rate
-                                    setattr(tile.gases, gas_type, getattr(tile.gases, gas_type) - diff)
-                                    setattr(neighbor.gases, gas_type, getattr(neighbor.gases, gas_type) + diff)
-                    continue  # Skip regular gas spreading for pipes
-
-                # For non-pipe tiles, don't interact with pipes
-                if tile.door:  # Skip closed doors
-                    continue
-                    
-                # Get valid neighbors (no walls, no pipes, no doors)
-                valid_neighbors = []
-                curr_gas = old_gases[row][col]
+        # Dissipation compounds over the whole time step
+        retained = (1 - VACUUM_DISSIPATION_RATE) ** GAS_TIME_STEP
+        if self.gas_lod:
+            # Coarse blocks are settled: diffusion would not change them and
+            # the LOD has already dissipated the coarse vacuum
+            active_tiles = self.gas_lod.update(1 - retained)
+        else:
+            active_tiles = [tile for row in self.grid for tile in row]
+
+        for tile in active_tiles:
+            if not tile.room and not tile.wall:  # Vacuum tiles
+                # Rapidly decrease gas levels
+                tile.gases.o2 *= retained
+                tile.gases.co2 *= retained
+                tile.gases.n2 *= retained
                 
-                for dr, dc in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
-                    new_row, new_col = row + dr, col + dc
-                    if (0 <= new_row < ROWS and 0 <= new_col < COLS):
-                        neighbor = self.grid[new_row][new_col]
-                        if not neighbor.wall and not neighbor.door and not neighbor.pipe:
-                            valid_neighbors.append((new_row, new_col))
-
-                if not valid_neighbors:
-                    continue
-
-                # Calculate spread for each valid neighbor
-                base_rate = GAS_SPREAD_RATE / len(valid_neighbors)
-                for n_row, n_col in valid_neighbors:
-                    neighbor_gas = old_gases[n_row][n_col]
-                    spread_rate = base_rate * 2 if (tile.door or self.grid[n_row][n_col].door) else base_rate
-                    
-                    # Calculate gas exchange
-                    for gas_type in ['o2', 'co2', 'n2']:
-                        curr_val = getattr(curr_gas, gas_type)
-                        neighbor_val = getattr(neighbor_gas, gas_type)
-                        diff = (neighbor_val - curr_val) * spread_rate
-                        setattr(tile.gases, gas_type, getattr(tile.gases, gas_type) + diff)
+                # Clean up very small values
+                if tile.gases.o2 < 0.01: tile.gases.o2 = 0
+                if tile.gases.co2 < 0.01: tile.gases.co2 = 0
+                if tile.gases.n2 < 0.01: tile.gases.n2 = 0
+
+        adjacency = self.gas_adjacency
+        if adjacency is None or adjacency.topology_version != self.topology_version:
+            adjacency = self.gas_adjacency = GasAdjacency(self.grid, self.topology_version)
+        if GAS_SOLVER == "implicit":
+            touched = implicit_diffuse(adjacency, active_tiles, GAS_SPREAD_RATE, GAS_TIME_STEP,
+                                       IMPLICIT_MAX_ITERATIONS, IMPLICIT_TOLERANCE)
+        else:
+            touched = explicit_diffuse(adjacency, active_tiles, GAS_SPREAD_RATE, GAS_TIME_STEP)
+        if self.gas_lod:
+            # Coarse tiles bordering the fine ones trade gas with them too
+            self.changes.gases_updated([adjacency.tiles[i] for i in touched])
+        self.changes.gases_updated(active_tiles)
 
         # Update room gases
         for room in self.rooms:
@@ -326,32 +447,60 @@ class Simulator:
                     room_gases.co2 += tile.gases.co2
                     room_gases.n2 += tile.gases.n2
                 count = len(room.tiles)
-                room.gases = GasCell(
+                room.set_gases(GasCell(
                     room_gases.o2 / count,
                     room_gases.co2 / count,
                     room_gases.n2 / count
-                )
+                ))
+                self.changes.room_updated(room)
             room.update()
 
     def assign_pipe_networks(self):
+        """Rebuild pipe networks and their pipe graphs after a topology change"""
+        if self.pipe_topology_version == self.topology_version:
+            return
+        self.pipe_topology_version = self.topology_version
+
+        # Keep the gas that was in each pipe tile across the rebuild
+        old_gases = {}
+        for row in self.grid:
+            for tile in row:
+                if tile.pipe_network:
+                    if tile.pipe:
+                        old_gases[tile] = tile.pipe_network.tile_gases(tile)
+                    tile.pipe_network = None
+
+        self.pipe_networks = []
         visited = set()
         for row in range(ROWS):
             for col in range(COLS):
                 tile = self.grid[row][col]
                 if tile.pipe and tile not in visited:
                     pipe_network = PipeNetwork()
-                    self._dfs_pipe_network(tile, pipe_network, visited)
-
-    def _dfs_pipe_network(self, tile, pipe_network, visited):
-        visited.add(tile)
-        pipe_network.add_tile(tile)
-        row, col = tile.row, tile.col
-        for dr, dc in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
-            nr, nc = row + dr, col + dc
-            if 0 <= nr < ROWS and 0 <= nc < COLS:
-                neighbor = self.grid[nr][nc]
-                if neighbor.pipe and neighbor not in visited:
-                    self._dfs_pipe_network(neighbor, pipe_network, visited)
+                    self._dfs_pipe_network(tile, pipe_network, visited, old_gases)
+                    pipe_network.build_edges()
+                    self.pipe_networks.append(pipe_network)
+        self.changes.networks_rebuilt(self.pipe_networks)
+
+    def _dfs_pipe_network(self, start_tile, pipe_network, visited, old_gases):
+        visited.add(start_tile)
+        to_check = [start_tile]
+        while to_check:
+            tile = to_check.pop()
+            pipe_network.add_tile(tile, old_gases.get(tile, (0, 0, 0)))
+            row, col = tile.row, tile.col
+            for dr, dc in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
+                nr, nc = row + dr, col + dc
+                if 0 <= nr < ROWS and 0 <= nc < COLS:
+                    neighbor = self.grid[nr][nc]
+                    if neighbor.pipe and neighbor not in visited:
+                        visited.add(neighbor)
+                        to_check.append(neighbor)
+
+    def update_pipe_flow(self):
+        for pipe_network in self.pipe_networks:
+            pipe_network.flow(PIPE_FLOW_RATE, PIPE_FLOW_SUBSTEPS)
+            self.changes.network_updated(pipe_network)
 
     def propagate_power(self, start_tile):
         # Only propagate if the tile has a powered engine
@@ -380,49 +529,170 @@ class Simulator:
         return powered
 
     def update_power_network(self):
-        # Reset power state for all tiles
-        for row in self.grid:
-            for tile in row:
-                tile.powered = False
-
         # First run engines to determine their power state
-        for row in self.grid:
-            for tile in row:
-                if tile.component and isinstance(tile.component, Engine):
-                    tile.component.run()  # This sets the engine's powered state based on gases
+        for row, col in self.components.positions(Engine):
+            self.grid[row][col].component.run()  # This sets the engine's powered state based on gases
 
-        # Then propagate power only from powered engines
-        for row in self.grid:
-            for tile in row:
-                if (tile.component and isinstance(tile.component, Engine) and 
-                    tile.component.powered):  # Only propagate if engine is actually powered
-                    self.propagate_power(tile)
+        self.refresh_power_labels()
+
+    def refresh_power_labels(self):
+        """Recompute which tiles are powered from the engines' current state"""
+        # Reset power state for the tiles powered last time
+        previous = self.powered_tiles
+        for tile in previous:
+            tile.powered = False
+        self.powered_tiles = set()
+
+        # Propagate power only from powered engines
+        for row, col in self.components.positions(Engine):
+            tile = self.grid[row][col]
+            if tile.component.powered:  # Only propagate if engine is actually powered
+                self.powered_tiles |= self.propagate_power(tile)
+        self.changes.power_flipped(previous ^ self.powered_tiles)
+
+    def update_components(self):
+        for row, col in self.components.positions():
+            tile = self.grid[row][col]
+            if isinstance(tile.component, Engine):
+                tile.component.run()  # This will check O2 and set powered state
+            elif isinstance(tile.component, OxygenGenerator):
+                if tile.powered:
+                    tile.component.generate()
+            elif isinstance(tile.component, Plant):
+                tile.component.generate()  # Plant doesn't need power
+            elif isinstance(tile.component, Spac12):
+                tile.component.generate()  # SPAC doesn't need power
+            # Update this section to use new vent classes
+            elif isinstance(tile.component, (InputVent, OutputVent)):
+                tile.component.update()  # Update ventilation systems
+
+    def set_component(self, tile, component):
+        """Place a component on a tile, or remove it with None, keeping the index in sync"""
+        self.mark_changed(tile.row, tile.col)
+        if tile.component:
+            self.components.remove(tile.row, tile.col, tile.component)
+        tile.component = component
+        if component:
+            component.tile = tile
+            self.components.add(tile.row, tile.col, component)
+
+    def mark_changed(self, row, col):
+        """Note a structural change to a tile for the autosave, the tick's change set and its links"""
+        self.changed_chunks.add((row // CHUNK_SIZE, col // CHUNK_SIZE))
+        self.changes.tile_edited(row, col)
+        self.links.touch(row, col)
+
+    def tick(self):
+        """Advance the simulation by one frame, without any input or drawing"""
+        metrics = self.metrics
+        start = tick_start = time.perf_counter() if metrics else 0.0
+        self.update_counter += 1
+
+        if self.update_counter % 10 == 0:
+            self.update_power_network()
+            if metrics:
+                start = metrics.record("power", start)
+            self.assign_pipe_networks()  # Rebuilds only when the topology changed
+            if metrics:
+                start = metrics.record("pipe_networks", start)
+            self.update_components()
+            if metrics:
+                start = metrics.record("components", start)
+
+        if self.update_counter % 5 == 0:
+            self.update_gases()
+            if metrics:
+                start = metrics.record("gases", start)
+            self.update_pipe_flow()
+            if metrics:
+                start = metrics.record("pipe_flow", start)
+
+        self.update_particles()
+        if metrics:
+            metrics.record("particles", start)
+        self.changes.publish(self.update_counter)
+        if self.exporter and self.update_counter % EXPORT_INTERVAL == 0:
+            self.exporter.publish()
+        if metrics:
+            metrics.tick_done(tick_start)
+
+    def save(self, path="station.json"):
+        """Save the current station layout so it can be reloaded or batch-run"""
+        from station import save_station
+        save_station(self, path)
+        self.notify(f"Station saved to {path}.")
+
+    def notify(self, message):
+        """Show a message to the player, if there is one watching"""
+        if self.worker:
+            self.worker.messages.append(message)  # Shown by the main thread, which draws the snackbar
+        elif self.snackbar:
+            self.snackbar.show(message)
+
+    def shed_frame_work(self):
+        """Apply the frame budget's degradations to particles and the UI, and tell the player"""
+        budget = self.frame_budget
+        self.particles.emission_scale = budget.particle_scale
+        self.ui.animate = self.snackbar.animate = budget.animations
+        self.notify(f"Reduced effects: {budget.describe()}." if budget.level else "Full effects restored.")
+
+    def submit(self, function, *args):
+        """Run an edit on the thread that owns the world: the worker if there is one, else now"""
+        if self.worker:
+            self.worker.submit(function, *args)
+        else:
+            function(*args)
+
+    def undo(self):
+        if self.mouse_held:
+            self.notify("Finish the current edit first.")
+            return
+        self.notify("Undone." if self.history.undo() else "Nothing to undo.")
+
+    def redo(self):
+        if self.mouse_held:
+            self.notify("Finish the current edit first.")
+            return
+        self.notify("Redone." if self.history.redo() else "Nothing to redo.")
+
+    def release_mouse(self):
+        """End the current drag: apply any line or rectangle and close its batch"""
+        self.last_modified_pos = None
+        try:
+            self.finish_stroke()
+        finally:
+            self.end_batch()
 
     def run(self):
+        if SIM_THREAD_ENABLED:
+            from worker import SimulationWorker
+            self.worker = SimulationWorker(self, SIM_TICK_RATE)
+            self.worker.start()
+        profiler = None
+        if PROFILE_SLOW_FRAMES:
+            from profiler import SlowFrameProfiler
+            profiler = SlowFrameProfiler()
+
         running = True
         while running:
-            self.clock.tick(60)
-            self.update_counter += 1
-            
-            if self.update_counter % 10 == 0:
-                self.update_power_network()
-                self.assign_pipe_networks()  # Assign pipe networks every update
-                for row in self.grid:
-                    for tile in row:
-                        if tile.component:
-                            if isinstance(tile.component, Engine):
-                                tile.component.run()  # This will check O2 and set powered state
-                            elif isinstance(tile.component, OxygenGenerator):
-                                if tile.powered:
-                                    tile.component.generate()
-                            elif isinstance(tile.component, Plant):
-                                tile.component.generate()  # Plant doesn't need power
-                            elif isinstance(tile.component, Spac12):
-                                tile.component.generate()  # SPAC doesn't need power
-                            # Update this section to use new vent classes
-                            elif isinstance(tile.component, (InputVent, OutputVent)):
-                                tile.component.update()  # Update ventilation systems
+            frame_ms = self.clock.tick(60)
+            if self.metrics:
+                self.metrics.frame_done(frame_ms / 1000)
+            if profiler:
+                profiler.begin_frame()
+            if self.frame_budget:
+                self.frame_budget.begin_frame()
+            if not self.worker:
+                self.tick()
+                if self.autosaver:
+                    self.autosaver.update()  # Snapshot at the tick boundary, written in the background
             
+            keys = pygame.key.get_pressed()
+            pan_x = keys[pygame.K_RIGHT] - keys[pygame.K_LEFT]
+            pan_y = keys[pygame.K_DOWN] - keys[pygame.K_UP]
+            if pan_x or pan_y:
+                self.camera.pan(pan_x * CAMERA_PAN_SPEED, pan_y * CAMERA_PAN_SPEED)
+
             if self.mouse_held:
                 self.handle_click(pygame.mouse.get_pos(), is_held=True)
             
@@ -430,77 +700,149 @@ class Simulator:
                 if event.type == pygame.QUIT:
                     running = False
                 elif event.type == pygame.MOUSEBUTTONDOWN:
-                    if event.button in (4, 5) and self.ui.sidebar_animation > 0:  # Mouse wheel
-                        self.ui.handle_scroll(event)
-                    else:
+                    game_pos = (event.pos[0] - self.ui.game_view_offset, event.pos[1])
+                    over_game = 0 <= game_pos[0] < GRID_SIZE and not self.ui.is_clicking_ui(event.pos)
+                    if event.button in (4, 5) and over_game:  # Mouse wheel zooms the map
+                        step = CAMERA_ZOOM_STEP if event.button == 4 else 1 / CAMERA_ZOOM_STEP
+                        self.camera.zoom_at(step, game_pos)
+                    elif event.button in (4, 5):
+                        if self.ui.sidebar_animation > 0:
+                            self.ui.handle_scroll(event)
+                    elif event.button == 2:
+                        self.panning = True
+                    elif not self.mouse_held:  # Other buttons pressed during a drag are ignored
                         self.mouse_held = True
+                        self.drag_button = event.button
+                        self.submit(self.begin_batch)  # A whole drag is one undo step and one recompute
                         self.handle_click(pygame.mouse.get_pos())
+                elif event.type == pygame.MOUSEMOTION:
+                    if self.panning:
+                        self.camera.pan(-event.rel[0], -event.rel[1])
                 elif event.type == pygame.MOUSEBUTTONUP:
-                    if event.button not in (4, 5):  # Ignore mouse wheel
+                    if event.button == 2:
+                        self.panning = False
+                    elif self.mouse_held and event.button == self.drag_button:  # The button that began the drag
                         self.mouse_held = False
-                        self.last_modified_pos = None
-
-            self.win.fill(DARK_BG)
-            
-            # Create game view surface
-            game_view_surface = pygame.Surface((GRID_SIZE, HEIGHT))
-            game_view_surface.fill(DARK_BG)
-            
-            # Draw tiles to game surface
-            for row in self.grid:
-                for tile in row:
-                    tile.draw(game_view_surface)
-            
-            # Draw particles after drawing tiles
-            self.draw_particles(game_view_surface)
-
-            # Draw game view with offset
-            self.win.blit(game_view_surface, (self.ui.game_view_offset, 0))
-            
-            # Draw sidebar using UI class
-            self.ui.draw_sidebar(self.mode, self.selected_tool)
-            
-            if self.update_counter % 5 == 0:
-                self.update_gases()
-            
-            # Draw popups with adjusted positions
-            if self.closing_popup and self.closing_popup.visible:
-                # Adjust popup position based on game view offset
-                self.closing_popup.rect.x = self.closing_popup.rect.x + self.ui.game_view_offset
-                self.closing_popup.draw(self.win)
-                self.closing_popup.rect.x = self.closing_popup.rect.x - self.ui.game_view_offset
-                if not self.closing_popup.visible:
-                    self.closing_popup = None
-            if self.active_popup:
-                # Adjust popup position based on game view offset
-                self.active_popup.rect.x = self.active_popup.rect.x + self.ui.game_view_offset
-                self.active_popup.draw(self.win)
-                self.active_popup.rect.x = self.active_popup.rect.x - self.ui.game_view_offset
-            
-            # Draw snackbar on top
-            self.snackbar.draw(self.win)
-            
-            pygame.display.flip()
-
-            # Update particles
-            self.update_particles()
-
+                        self.drag_button = None
+                        self.submit(self.release_mouse)
+                elif event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_s and event.mod & pygame.KMOD_CTRL:
+                        self.submit(self.save)
+                    elif event.key == pygame.K_z and event.mod & pygame.KMOD_CTRL:
+                        self.submit(self.redo if event.mod & pygame.KMOD_SHIFT else self.undo)
+                    elif event.key == pygame.K_y and event.mod & pygame.KMOD_CTRL:
+                        self.submit(self.redo)
+                    elif event.key in (pygame.K_f, pygame.K_l, pygame.K_r) and not self.mouse_held:
+                        self.draw_shape = {pygame.K_f: Shape.FREEHAND, pygame.K_l: Shape.LINE,
+                                           pygame.K_r: Shape.RECT}[event.key]
+                        self.snackbar.show(f"Shape: {self.draw_shape.value}")
+                    elif event.key in (pygame.K_q, pygame.K_e) and self.prefab:
+                        # Rotate the prefab being stamped
+                        self.prefab_turns = (self.prefab_turns + (1 if event.key == pygame.K_e else -1)) % 4
+
+            self.draw()
+            if self.frame_budget and self.frame_budget.end_frame():
+                self.shed_frame_work()
+            if profiler:
+                profiler.end_frame(self.update_counter)
+
+        if self.worker:
+            self.worker.stop()
+        if self.autosaver:
+            self.autosaver.save()
+            self.autosaver.close()
+        if self.exporter:
+            self.exporter.close()
+        if self.metrics:
+            self.metrics.close()
         pygame.quit()
         pygame.quit()
 
-    def update_vacuum_state(self, tile):
-        """Mark a tile as vacuum if it's not part of a room and not a wall"""
-        if not tile.room and not tile.wall:
-            room_tiles = self.flood_fill(tile)
-            if not room_tiles:  # If flood fill returns empty set, it's vacuum
-                tile.room = None  # Ensure it's None to mark as vacuum
+    def draw(self):
+        """Render one frame of the station, sidebar and overlays to the window"""
+        self.win.fill(DARK_BG)
+        
+        # Create game view surface
+        game_view_surface = pygame.Surface((GRID_SIZE, HEIGHT))
+        game_view_surface.fill(DARK_BG)
+        
+        # With a worker thread, draw the state it published at the last tick
+        snapshot = self.worker.snapshot if self.worker else None
+        if not snapshot:
+            self.links.refresh()
+
+        # Under load the tiles are only redrawn every few frames, unless the view moves
+        budget = self.frame_budget
+        interval = budget.map_refresh_interval if budget else 1
+        map_surface = game_view_surface
+        redraw = True
+        if interval > 1:
+            if self.map_layer is None:
+                self.map_layer = pygame.Surface((GRID_SIZE, HEIGHT))
+            map_surface = self.map_layer
+            view = (self.camera.x, self.camera.y, self.camera.zoom, self.mode)
+            self.map_frames += 1
+            redraw = view != self.map_view or self.map_frames >= interval
+            if redraw:
+                self.map_view = view
+                self.map_frames = 0
+                map_surface.fill(DARK_BG)
+        else:
+            self.map_layer = self.map_view = None
+
+        # Draw only the tiles the camera can see
+        if redraw:
+            row0, col0, row1, col1 = self.camera.visible_tiles()
+            tiles = []
+            for row in range(row0, row1 + 1):
+                grid_row = self.grid[row]
+                for col in range(col0, col1 + 1):
+                    state = snapshot.tile_state(row, col) if snapshot else None
+                    if state is None:
+                        state = grid_row[col].render_state()  # Not captured yet, e.g. just panned into view
+                    tiles.append((self.camera.tile_rect(row, col), state))
+            draw_tiles(map_surface, tiles, self.mode)
+        if map_surface is not game_view_surface:
+            game_view_surface.blit(map_surface, (0, 0))
+        
+        # Draw particles after drawing tiles, unless the frame budget has turned them off
+        if not budget or budget.draw_particles:
+            if snapshot:
+                snapshot.particles.draw(game_view_surface, self.camera)
+            else:
+                self.draw_particles(game_view_surface)
+        self.draw_stroke_preview(game_view_surface, snapshot)
+
+        # Draw game view with offset
+        self.win.blit(game_view_surface, (self.ui.game_view_offset, 0))
+        
+        # Draw sidebar using UI class
+        self.ui.draw_sidebar(self.mode, self.selected_tool)
+        
+        # Draw popups with adjusted positions
+        if self.closing_popup and self.closing_popup.visible:
+            # Adjust popup position based on game view offset
+            self.closing_popup.rect.x = self.closing_popup.rect.x + self.ui.game_view_offset
+            self.closing_popup.draw(self.win, self.ui.animate)
+            self.closing_popup.rect.x = self.closing_popup.rect.x - self.ui.game_view_offset
+            if not self.closing_popup.visible:
+                self.closing_popup = None
+        if self.active_popup:
+            # Adjust popup position based on game view offset
+            self.active_popup.rect.x = self.active_popup.rect.x + self.ui.game_view_offset
+            self.active_popup.draw(self.win, self.ui.animate)
+            self.active_popup.rect.x = self.active_popup.rect.x - self.ui.game_view_offset
+        
+        # Draw snackbar on top
+        if self.worker:
+            while self.worker.messages:
+                self.snackbar.show(self.worker.messages.popleft())
+        self.snackbar.draw(self.win)
+        
+        pygame.display.flip()
 
     def update_particles(self):
-        for particle in self.particles[:]:
-            particle.update()
-            if not particle.is_alive():
-                self.particles.remove(particle)
+        self.particles.update()
 
     def draw_particles(self, surface):
-        for particle in self.particles:
-            particle.draw(surface)
+        self.particles.draw(surface, self.camera)
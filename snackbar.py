@@ -1,6 +1,8 @@
 import pygame
 from constants import WHITE, GRAY
+from fonts import get_font
 import math
+from collections import deque
 
 class SnackbarMessage:
     def __init__(self, message, width, target_y):
@@ -71,7 +73,12 @@ class SnackbarMessage:
             if self.anim_progress >= 1.0:
                 self.visible = False
 
-    def update_typewriter(self):
+    def update_typewriter(self, animate=True):
+        if not animate:
+            # Show the whole message at once
+            self.current_message = self.full_message
+            self.char_index = len(self.full_message)
+            return
         current_time = pygame.time.get_ticks()
         if current_time - self.last_char_time > self.char_delay:
             if self.char_index < len(self.full_message):
@@ -96,19 +103,25 @@ class SnackbarMessage:
 class Snackbar:
     def __init__(self, width, height):
         self.messages = []
-        try:
-            self.font = pygame.font.Font('./fonts/fontalt.ttf', 16)
-        except (FileNotFoundError, RuntimeError) as e:
-            print(f"Could not load snackbar font: {e}")
-            self.font = pygame.font.SysFont('arial', 16)
         self.max_messages = 5
         self.message_height = 25
         self.message_width = 250
         self.padding = 10
         self.base_y = height - (self.message_height + self.padding)
         self.message_queue = []  # Queue for pending messages
+        self.incoming = deque()  # Messages shown since the last draw, possibly from the simulation thread
+        self.animate = True  # False skips the typewriter effect, to save frame time
+
+    @property
+    def font(self):
+        # Loaded on the first message rather than at startup
+        return get_font('./fonts/fontalt.ttf', 16)
 
     def show(self, message):
+        # deque appends are thread-safe; the message is laid out on the next draw
+        self.incoming.append(message)
+
+    def add(self, message):
         if len(self.messages) >= self.max_messages:
             # Queue the message if we're at max capacity
             self.message_queue.append(message)
@@ -130,6 +143,9 @@ class Snackbar:
                 current_index += 1
 
     def draw(self, win):
+        while self.incoming:
+            self.add(self.incoming.popleft())
+
         current_time = pygame.time.get_ticks()
         remaining_messages = []
         
@@ -137,7 +153,7 @@ class Snackbar:
         for msg in self.messages:
             if msg.visible:
                 msg.update_animation(current_time)
-                msg.update_typewriter()
+                msg.update_typewriter(self.animate)
                 
                 # Only keep visible messages
                 remaining_messages.append(msg)
@@ -151,7 +167,7 @@ class Snackbar:
 
         # Check if we can show queued messages
         if self.message_queue and len(self.messages) < self.max_messages:
-            self.show(self.message_queue.pop(0))
+            self.add(self.message_queue.pop(0))
 
         # Draw remaining messages
         for msg in self.messages:
@@ -0,0 +1,57 @@
+from constants import CHUNK_SIZE
+
+
+class ComponentIndex:
+    """Tile positions of placed components, by component type and by map chunk.
+
+    Kept in sync by Simulator.set_component so systems can find engines,
+    vents or plants without scanning the whole grid.
+    """
+    def __init__(self, chunk_size=CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        # Dicts are used as insertion-ordered sets of (row, col)
+        self.by_type = {}
+        self.by_chunk = {}
+
+    def chunk_of(self, row, col):
+        return row // self.chunk_size, col // self.chunk_size
+
+    def add(self, row, col, component):
+        self.by_type.setdefault(type(component), {})[(row, col)] = None
+        self.by_chunk.setdefault(self.chunk_of(row, col), {})[(row, col)] = None
+
+    def remove(self, row, col, component):
+        positions = self.by_type.get(type(component))
+        if positions is not None:
+            positions.pop((row, col), None)
+        chunk = self.by_chunk.get(self.chunk_of(row, col))
+        if chunk is not None:
+            chunk.pop((row, col), None)
+            if not chunk:
+                del self.by_chunk[self.chunk_of(row, col)]
+
+    def clear(self):
+        self.by_type.clear()
+        self.by_chunk.clear()
+
+    def positions(self, *types):
+        """Positions of components of exactly the given types, or of all components"""
+        if not types:
+            types = self.by_type.keys()
+        result = []
+        for component_type in types:
+            result.extend(self.by_type.get(component_type, ()))
+        return result
+
+    def count(self, component_type):
+        return len(self.by_type.get(component_type, ()))
+
+    def in_region(self, row0, col0, row1, col1):
+        """Positions of all components with row0 <= row <= row1 and col0 <= col <= col1"""
+        result = []
+        for chunk_row in range(row0 // self.chunk_size, row1 // self.chunk_size + 1):
+            for chunk_col in range(col0 // self.chunk_size, col1 // self.chunk_size + 1):
+                for row, col in self.by_chunk.get((chunk_row, chunk_col), ()):
+                    if row0 <= row <= row1 and col0 <= col <= col1:
+                        result.append((row, col))
+        return result
@@ -0,0 +1,89 @@
+"""Cold start benchmark.
+
+Starts a fresh interpreter for every sample so imports are really cold, and
+times each stage of getting the game on screen:
+
+    python startup_bench.py --runs 5 --size 20 60 120
+
+    import        importing simulator (and with it pygame)
+    init          Simulator() including the window
+    first_frame   drawing and flipping the first frame
+    first_tick    the first simulation tick that updates every system
+
+--size overrides ROWS and COLS to check that startup stays flat on large maps.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+STAGES = ["import", "init", "first_frame", "first_tick"]
+
+
+def measure(size):
+    """Time one cold start in this process, returning seconds per stage"""
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    timings = {}
+    start = time.perf_counter()
+
+    import constants
+    if size:
+        # Must happen before anything copies the constants with `from constants import *`
+        constants.ROWS = constants.COLS = size
+        constants.TILE_SIZE = max(constants.GRID_SIZE // size, 1)
+    from simulator import Simulator
+    timings["import"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    simulator = Simulator()
+    timings["init"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    simulator.draw()
+    timings["first_frame"] = time.perf_counter() - start
+
+    # Tick 10 is the first one that runs power, pipes, components and gases together
+    for _ in range(9):
+        simulator.tick()
+    start = time.perf_counter()
+    simulator.tick()
+    timings["first_tick"] = time.perf_counter() - start
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold start time of the simulator.")
+    parser.add_argument("--runs", type=int, default=5, help="cold starts per map size (default: 5)")
+    parser.add_argument("--size", type=int, nargs="+", default=[0],
+                        help="map sizes to test, 0 for the default ROWS x COLS")
+    parser.add_argument("--child", type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child is not None:
+        print(json.dumps(measure(args.child)))
+        return 0
+
+    for size in args.size:
+        samples = {stage: [] for stage in STAGES}
+        for _ in range(args.runs):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", str(size)],
+                check=True, capture_output=True, text=True
+            ).stdout
+            timings = json.loads(output.strip().splitlines()[-1])
+            for stage in STAGES:
+                samples[stage].append(timings[stage])
+
+        label = f"{size}x{size}" if size else "default"
+        total = sum(statistics.median(samples[stage]) for stage in STAGES)
+        print(f"{label} map, median of {args.runs} runs, {total * 1000:.1f} ms total")
+        for stage in STAGES:
+            print(f"  {stage:<12} {statistics.median(samples[stage]) * 1000:8.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+import json
+import os
+import tempfile
+from constants import ROWS, COLS
+from gas import GasCell
+from room import Room
+from components import Engine, OxygenGenerator, InputVent, OutputVent, Plant, Spac12
+
+STATION_FORMAT_VERSION = 1
+
+# Component classes by the name stored in station files
+COMPONENT_TYPES = {
+    "Engine": Engine,
+    "OxygenGenerator": OxygenGenerator,
+    "InputVent": InputVent,
+    "OutputVent": OutputVent,
+    "Plant": Plant,
+    "Spac12": Spac12,
+}
+
+
+def station_to_dict(simulator):
+    """Encode the station layout as a plain dict, storing only non-empty tiles"""
+    room_ids = {room: index for index, room in enumerate(simulator.rooms)}
+    tiles = []
+    for row in simulator.grid:
+        for tile in row:
+            entry = {}
+            for flag in ("wall", "door", "wire", "pipe"):
+                if getattr(tile, flag):
+                    entry[flag] = True
+            if tile.room in room_ids:
+                entry["room"] = room_ids[tile.room]
+            if tile.component:
+                entry["component"] = type(tile.component).__name__
+            if tile.gases.total() > 0:
+                entry["gases"] = [tile.gases.o2, tile.gases.co2, tile.gases.n2]
+            if tile.damage:
+                entry["damage"] = tile.damage
+            if entry:
+                entry["row"] = tile.row
+                entry["col"] = tile.col
+                tiles.append(entry)
+
+    return {
+        "version": STATION_FORMAT_VERSION,
+        "rows": ROWS,
+        "cols": COLS,
+        "rooms": len(simulator.rooms),
+        "tiles": tiles,
+    }
+
+
+def load_station_dict(simulator, data):
+    """Rebuild a freshly created simulator's grid from a station dict"""
+    if data.get("version") != STATION_FORMAT_VERSION:
+        raise ValueError(f"Unsupported station format version: {data.get('version')}")
+    if data["rows"] != ROWS or data["cols"] != COLS:
+        raise ValueError(f"Station is {data['rows']}x{data['cols']}, expected {ROWS}x{COLS}")
+
+    rooms = [Room(set()) for _ in range(data.get("rooms", 0))]
+    for entry in data["tiles"]:
+        tile = simulator.grid[entry["row"]][entry["col"]]
+        tile.wall = entry.get("wall", False)
+        tile.door = entry.get("door", False)
+        tile.wire = entry.get("wire", False)
+        tile.pipe = entry.get("pipe", False)
+        tile.damage = entry.get("damage", 0.0)
+        simulator.mark_changed(tile.row, tile.col)
+        if "gases" in entry:
+            tile.gases = GasCell(*entry["gases"])
+        if "room" in entry:
+            tile.room = rooms[entry["room"]]
+            tile.room.tiles.add(tile)
+
+    # Components are attached once every tile knows its room
+    for entry in data["tiles"]:
+        if "component" in entry:
+            tile = simulator.grid[entry["row"]][entry["col"]]
+            simulator.set_component(tile, COMPONENT_TYPES[entry["component"]](tile.room))
+
+    simulator.rooms = [room for room in rooms if room.tiles]
+    simulator.topology_version += 1
+
+
+def write_json_atomic(data, path):
+    """Write JSON to a temporary file next to path, then rename it over path.
+
+    Readers and crashes only ever see the old file or the complete new one.
+    """
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def save_station(simulator, path):
+    write_json_atomic(station_to_dict(simulator), path)
+
+
+def load_station(simulator, path):
+    with open(path) as f:
+        load_station_dict(simulator, json.load(f))
@@ -2,6 +2,7 @@ import pygame
 import time
 from enums import Mode, Tool
 from constants import *
+from fonts import get_font
 
 class UI:
     def __init__(self, win, font):
@@ -15,6 +16,7 @@ class UI:
         self.active_button = None
         self.button_animations = {}  # Store button hover/click animations
         self.game_view_offset = 0  # Offset for the game view
+        self.animate = True  # False snaps the sidebar and buttons to their end state, to save frame time
         
         # Add scroll view properties
         self.scroll_y = 0
@@ -60,8 +62,11 @@ class UI:
         target_click = 1.0 if is_active else 0.0
         anim = self.button_animations[button_key]
         
-        anim['hover'] += (target_hover - anim['hover']) * 0.2
-        anim['click'] += (target_click - anim['click']) * 0.3
+        if self.animate:
+            anim['hover'] += (target_hover - anim['hover']) * 0.2
+            anim['click'] += (target_click - anim['click']) * 0.3
+        else:
+            anim['hover'], anim['click'] = target_hover, target_click
 
         elevation = 2 * (1 - anim['click'])
         hover_expand = 2 * anim['hover']
@@ -85,7 +90,7 @@ class UI:
         current_time = time.time()
         if self.sidebar_animation_start > 0:
             progress = (current_time - self.sidebar_animation_start) / self.sidebar_animation_duration
-            progress = min(1.0, progress)
+            progress = min(1.0, progress) if self.animate else 1.0
             progress = self.ease_in_out_cubic(progress)
             
             target = 1.0 if self.sidebar_visible else 0.0
@@ -159,11 +164,7 @@ class UI:
                 y_pos += 10
 
         if mode == Mode.INSPECT:
-            try:
-                scale_font = pygame.font.Font('./fonts/font.ttf', int(self.font.get_height() / 2))
-            except (FileNotFoundError, RuntimeError) as e:
-                print(f"Could not load scale font: {e}")
-                scale_font = pygame.font.SysFont('arial', int(self.font.get_height() / 2))
+            scale_font = get_font('./fonts/font.ttf', int(self.font.get_height() / 2))
             
             y_pos += 20
             header_rect = pygame.Rect(5, y_pos - self.scroll_y, SIDEBAR_WIDTH - 10, 30)
@@ -0,0 +1,220 @@
+"""Lightweight viewer for a station running in server.py.
+
+Draws the streamed tiles with the game's own tile renderer and sends edits
+back to the server:
+
+    python viewer.py --host 127.0.0.1 --port 7777
+
+1-9, 0 and Delete pick a tool, left drag builds, Tab toggles the inspect
+overlay, Ctrl+Z / Ctrl+Y undo and redo, the wheel zooms and middle drag
+or the arrow keys pan.
+"""
+import argparse
+import json
+import os
+import socket
+import sys
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame
+from constants import (
+    ROWS, COLS, GRID_SIZE, HEIGHT, DARK_BG, UI_ACCENT, SERVER_HOST, SERVER_PORT,
+    CAMERA_ZOOM_STEP, CAMERA_PAN_SPEED
+)
+from enums import Mode, Tool
+from camera import Camera
+from fonts import get_font
+from protocol import PROTOCOL_VERSION, encode_message, empty_record, record_render_state, is_empty
+from shapes import line_cells
+from tile import draw_tiles
+
+# Tools by number key, in sidebar order
+TOOL_KEYS = {
+    pygame.K_1: Tool.WALL, pygame.K_2: Tool.DOOR, pygame.K_3: Tool.WIRE, pygame.K_4: Tool.ENGINE,
+    pygame.K_5: Tool.OXYGEN, pygame.K_6: Tool.VENT_IN, pygame.K_7: Tool.VENT_OUT, pygame.K_8: Tool.PIPE,
+    pygame.K_9: Tool.PLANT, pygame.K_0: Tool.SPAC, pygame.K_DELETE: Tool.DELETE,
+}
+
+
+class RemoteStation:
+    """The viewer's copy of the server's tiles, kept up to date from keyframes and deltas"""
+    def __init__(self):
+        self.precision = 1.0
+        self.records = {}  # (row, col) -> record, for non-empty tiles
+        self.flags = [[0] * COLS for _ in range(ROWS)]
+        self.states = {}  # Render states by (row, col), rebuilt lazily after a change
+        self.tick = 0
+
+    def apply(self, message):
+        kind = message["type"]
+        if kind == "hello":
+            if message["version"] != PROTOCOL_VERSION:
+                raise ValueError(f"Server speaks protocol {message['version']}, expected {PROTOCOL_VERSION}")
+            if message["rows"] != ROWS or message["cols"] != COLS:
+                raise ValueError(f"Server map is {message['rows']}x{message['cols']}, expected {ROWS}x{COLS}")
+            self.precision = message["precision"]
+        elif kind == "keyframe":
+            self.records.clear()
+            self.flags = [[0] * COLS for _ in range(ROWS)]
+            self.states.clear()
+            self.update(message["tiles"])
+            self.tick = message["tick"]
+        elif kind == "delta":
+            self.update(message["tiles"])
+            self.tick = message["tick"]
+
+    def update(self, records):
+        for record in records:
+            row, col = record[0], record[1]
+            if is_empty(record):
+                self.records.pop((row, col), None)
+            else:
+                self.records[(row, col)] = record
+            self.flags[row][col] = record[2]
+            # Wire and pipe links depend on the neighbours too
+            for dr, dc in [(0, 0), (0, 1), (1, 0), (0, -1), (-1, 0)]:
+                self.states.pop((row + dr, col + dc), None)
+
+    def render_state(self, row, col):
+        state = self.states.get((row, col))
+        if state is None:
+            record = self.records.get((row, col)) or empty_record(row, col)
+            state = record_render_state(record, self.flags, self.precision)
+            self.states[(row, col)] = state
+        return state
+
+
+class Viewer:
+    def __init__(self, host, port):
+        pygame.init()
+        self.win = pygame.display.set_mode((GRID_SIZE, HEIGHT))
+        pygame.display.set_caption(f"Pressurex viewer - {host}:{port}")
+        self.clock = pygame.time.Clock()
+        self.camera = Camera()
+        self.station = RemoteStation()
+        self.mode = Mode.CREATE
+        self.tool = Tool.WALL
+        self.drag_from = None
+        self.panning = False
+
+        self.sock = socket.create_connection((host, port))
+        self.sock.setblocking(False)
+        self.inbox = b""
+        self.connected = True
+
+    def send(self, message):
+        if not self.connected:
+            return
+        self.sock.setblocking(True)
+        try:
+            self.sock.sendall(encode_message(message))
+        except ConnectionError:
+            self.connected = False  # Reported by the next receive
+        finally:
+            self.sock.setblocking(False)
+
+    def receive(self):
+        """Apply everything the server has sent; returns False once it disconnects"""
+        while self.connected:
+            try:
+                data = self.sock.recv(1 << 20)
+            except BlockingIOError:
+                return True
+            except ConnectionError:
+                data = b""
+            if not data:
+                self.connected = False
+                break
+            self.inbox += data
+            *lines, self.inbox = self.inbox.split(b"\n")
+            for line in lines:
+                if line:
+                    self.station.apply(json.loads(line))
+        return False
+
+    def edit(self, pos):
+        row, col = self.camera.screen_to_tile(pos)
+        if not (0 <= row < ROWS and 0 <= col < COLS) or (row, col) == self.drag_from:
+            return
+        start = self.drag_from or (row, col)
+        self.drag_from = (row, col)
+        self.send({"type": "edit", "tool": self.tool.value, "cells": line_cells(start, (row, col))})
+
+    def handle(self, event):
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            if event.button in (4, 5):
+                self.camera.zoom_at(CAMERA_ZOOM_STEP if event.button == 4 else 1 / CAMERA_ZOOM_STEP, event.pos)
+            elif event.button == 2:
+                self.panning = True
+            elif event.button == 1:
+                self.drag_from = None
+                self.send({"type": "begin"})  # The whole drag is one edit on the server
+                self.edit(event.pos)
+        elif event.type == pygame.MOUSEMOTION:
+            if self.panning:
+                self.camera.pan(-event.rel[0], -event.rel[1])
+            elif event.buttons[0] and self.drag_from:
+                self.edit(event.pos)
+        elif event.type == pygame.MOUSEBUTTONUP:
+            if event.button == 2:
+                self.panning = False
+            elif event.button == 1:
+                self.drag_from = None
+                self.send({"type": "end"})
+        elif event.type == pygame.KEYDOWN:
+            if event.key in TOOL_KEYS:
+                self.tool = TOOL_KEYS[event.key]
+            elif event.key == pygame.K_TAB:
+                self.mode = Mode.INSPECT if self.mode == Mode.CREATE else Mode.CREATE
+            elif event.key == pygame.K_z and event.mod & pygame.KMOD_CTRL:
+                self.send({"type": "redo" if event.mod & pygame.KMOD_SHIFT else "undo"})
+            elif event.key == pygame.K_y and event.mod & pygame.KMOD_CTRL:
+                self.send({"type": "redo"})
+
+    def draw(self):
+        self.win.fill(DARK_BG)
+        row0, col0, row1, col1 = self.camera.visible_tiles()
+        draw_tiles(self.win, [(self.camera.tile_rect(row, col), self.station.render_state(row, col))
+                              for row in range(row0, row1 + 1) for col in range(col0, col1 + 1)], self.mode)
+
+        font = get_font('./fonts/font.ttf', 20)
+        label = f"{self.tool.value}  |  tick {self.station.tick}  |  {self.clock.get_fps():.0f} fps"
+        self.win.blit(font.render(label, False, UI_ACCENT), (8, 8))
+        pygame.display.flip()
+
+    def run(self):
+        running = True
+        while running:
+            self.clock.tick(60)
+            keys = pygame.key.get_pressed()
+            pan_x = keys[pygame.K_RIGHT] - keys[pygame.K_LEFT]
+            pan_y = keys[pygame.K_DOWN] - keys[pygame.K_UP]
+            if pan_x or pan_y:
+                self.camera.pan(pan_x * CAMERA_PAN_SPEED, pan_y * CAMERA_PAN_SPEED)
+
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
+                else:
+                    self.handle(event)
+            if not self.receive():
+                print("Server closed the connection")
+                running = False
+            self.draw()
+
+        self.sock.close()
+        pygame.quit()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Watch and edit a station served by server.py.")
+    parser.add_argument("--host", default=SERVER_HOST, help=f"server address (default: {SERVER_HOST})")
+    parser.add_argument("--port", type=int, default=SERVER_PORT, help=f"server port (default: {SERVER_PORT})")
+    args = parser.parse_args(argv)
+    Viewer(args.host, args.port).run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+import queue
+import threading
+from collections import deque
+import time
+import traceback
+from constants import ROWS, COLS
+
+
+class RenderSnapshot:
+    """What the main thread needs to draw one frame, frozen at a tick boundary.
+
+    Holds tile render states for a block of rows and columns (the camera view
+    when it was captured), the particle frame, and the drag and prefab the
+    stroke preview outlines. Nothing in it is mutated after capture, so the
+    worker can build the next one while this is drawn.
+    """
+    def __init__(self, tick, row0, col0, tiles, particles, stroke_start=None, stroke_end=None, prefab=None):
+        self.tick = tick
+        self.row0 = row0
+        self.col0 = col0
+        self.tiles = tiles
+        self.particles = particles
+        self.stroke_start = stroke_start
+        self.stroke_end = stroke_end
+        self.prefab = prefab
+
+    @classmethod
+    def capture(cls, simulator, region):
+        row0, col0, row1, col1 = region
+        grid = simulator.grid
+        simulator.links.refresh()
+        tiles = tuple(
+            tuple(grid[row][col].render_state() for col in range(col0, col1 + 1))
+            for row in range(row0, row1 + 1)
+        )
+        return cls(simulator.update_counter, row0, col0, tiles, simulator.particles.frame(),
+                   simulator.stroke_start, simulator.stroke_end, simulator.prefab)
+
+    def tile_state(self, row, col):
+        """The tile's captured render state, or None if it was outside the captured region"""
+        row -= self.row0
+        col -= self.col0
+        if 0 <= row < len(self.tiles) and 0 <= col < len(self.tiles[row]):
+            return self.tiles[row][col]
+        return None
+
+
+class SimulationWorker:
+    """Runs the simulation on its own thread at a fixed tick rate.
+
+    The main thread only handles input and draws. Edits are sent as
+    (function, args) commands with submit and applied by the worker between
+    ticks, so the world is only ever touched from one thread. After every
+    tick (and every batch of commands) the worker publishes a new
+    RenderSnapshot by swapping one reference, which the main thread reads
+    with no locking. If a tick runs long, frames keep drawing the last
+    snapshot instead of waiting for it. Messages for the player are queued
+    on messages and shown by the main thread, which owns the snackbar and
+    the room popups.
+    """
+    def __init__(self, simulator, tick_rate):
+        self.simulator = simulator
+        self.tick_interval = 1.0 / tick_rate
+        self.commands = queue.SimpleQueue()
+        self.messages = deque()  # Snackbar messages from the worker, shown by the main thread
+        self.snapshot = None
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.publish()
+        self.thread = threading.Thread(target=self.loop, name="simulation", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Apply any commands still queued and stop the thread"""
+        self.running = False
+        self.commands.put(None)  # Wake the worker if it is waiting for commands
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+        self.run_commands()
+
+    def submit(self, function, *args):
+        self.commands.put((function, args))
+
+    def run_commands(self, timeout=None):
+        """Apply queued commands, waiting up to timeout seconds for the first one"""
+        applied = 0
+        while True:
+            try:
+                if applied == 0 and timeout:
+                    command = self.commands.get(timeout=timeout)
+                else:
+                    command = self.commands.get_nowait()
+            except queue.Empty:
+                return applied
+            if command is None:
+                continue
+            function, args = command
+            try:
+                function(*args)
+            except Exception:
+                # A bad edit should not take the whole simulation down
+                traceback.print_exc()
+            applied += 1
+
+    def publish(self):
+        simulator = self.simulator
+        region = simulator.camera.visible_tiles() if simulator.camera else (0, 0, ROWS - 1, COLS - 1)
+        self.snapshot = RenderSnapshot.capture(simulator, region)
+
+    def loop(self):
+        simulator = self.simulator
+        next_tick = time.perf_counter()
+        while self.running:
+            # Apply edits as they arrive while waiting for the next tick
+            remaining = next_tick - time.perf_counter()
+            while remaining > 0 and self.running:
+                if self.run_commands(timeout=remaining):
+                    self.publish()
+                remaining = next_tick - time.perf_counter()
+            if not self.running:
+                break
+
+            if self.run_commands():
+                self.publish()
+            simulator.tick()
+            if simulator.autosaver:
+                simulator.autosaver.update()
+            self.publish()
+
+            next_tick += self.tick_interval
+            if next_tick < time.perf_counter() - self.tick_interval:
+                next_tick = time.perf_counter()  # Too far behind, drop ticks rather than racing to catch up